@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import os
+from typing import Literal
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -33,6 +35,12 @@ class GenerateRequest(BaseModel):
     show_edge_labels: bool = True
     direction: str = "TB"
     make_gif: bool = True
+    extraction: Literal["single", "map_reduce", "heuristic"] = "single"
+    # this endpoint answers once the final diagram is done, so the preview
+    # only comes back alongside it (preview_png_url); for an early preview
+    # call run_pipeline with on_preview
+    preview: bool = False
+    simplify_graph: bool = False
 
 
 @app.post("/api/generate")
@@ -45,11 +53,15 @@ def generate(req: GenerateRequest):
         direction=req.direction,
         make_gif=req.make_gif,
         out_dir=OUT_DIR,
+        extraction=req.extraction,
+        preview=req.preview,
+        simplify_graph=req.simplify_graph,
     )
 
     # return URLs the frontend can load
     png_name = os.path.basename(res.png_path)
     gif_name = os.path.basename(res.gif_path) if res.gif_path else None
+    preview_name = os.path.basename(res.preview_png_path) if res.preview_png_path else None
 
     return {
         "run_id": res.run_id,
@@ -59,4 +71,5 @@ def generate(req: GenerateRequest):
         "scraped": res.scraped,
         "png_url": f"/out/{png_name}",
         "gif_url": f"/out/{gif_name}" if gif_name else None,
+        "preview_png_url": f"/out/{preview_name}" if preview_name else None,
     }
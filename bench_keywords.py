@@ -0,0 +1,74 @@
+"""
+Micro-benchmark: old per-keyword `kw in text` scans vs the shared KeywordMatcher.
+
+    python bench_keywords.py
+
+Install pyahocorasick to get the single-pass Aho-Corasick backend;
+without it the matcher falls back to substring counts.
+"""
+import random
+import time
+
+from sdvg.pipeline.keywords import (
+    DIAGRAM_HINTS,
+    LIGHT_SIGNALS,
+    PAYWALL_HINTS,
+    SCORE_SIGNALS,
+    SIGNAL_MATCHER,
+)
+
+
+def make_page(n_bytes: int, seed: int = 0) -> str:
+    random.seed(seed)
+    noise = [
+        "<div class=\"post\">", "</div>", "<span>", "</span>", "<p>", "</p>",
+        "function", "return", "var", "padding:0;", "margin:0;", "the", "and",
+        "user", "request", "server", "data", "system", "design", "cache",
+    ]
+    out, size = [], 0
+    while size < n_bytes:
+        w = random.choice(noise)
+        out.append(w)
+        size += len(w) + 1
+    return "<html><head><title>Uber System Design</title></head><body>" + " ".join(out) + "</body></html>"
+
+
+def legacy_scan(html: str) -> int:
+    # what _light_score_url + _is_paywalled + DIAGRAM_HINTS + _score's signal list did
+    hits = 0
+    t = html.lower()
+    for kw in LIGHT_SIGNALS:
+        hits += kw in t
+    hits += "<img" in t
+    hits += "diagram" in t or "architecture" in t
+    t = html.lower()
+    hits += any(h in t for h in PAYWALL_HINTS)
+    t = html.lower()
+    for k in DIAGRAM_HINTS:
+        hits += k in t
+    t = html.lower()
+    for kw in SCORE_SIGNALS:
+        hits += kw in t
+    return hits
+
+
+def matcher_scan(html: str) -> int:
+    # every keyword table, one call
+    return len(SIGNAL_MATCHER.present(html))
+
+
+def bench(fn, html: str, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn(html)
+        best = min(best, time.perf_counter() - t)
+    return best * 1000
+
+
+print(f"matcher backend: {SIGNAL_MATCHER.backend} ({len(SIGNAL_MATCHER.keywords)} keywords)")
+for mb in (1, 5):
+    page = make_page(mb * 1024 * 1024)
+    old_ms = bench(legacy_scan, page)
+    new_ms = bench(matcher_scan, page)
+    print(f"{mb} MB page: legacy {old_ms:7.1f} ms | matcher {new_ms:7.1f} ms | x{old_ms / new_ms:.2f}")
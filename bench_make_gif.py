@@ -0,0 +1,63 @@
+"""
+Micro-benchmark: pulse-GIF frame synthesis, old per-frame path
+(ImageEnhance blend, full-image resize + crop per scale) vs make_gif's
+(lookup-table fades, one crop-only resample per distinct scale).
+
+    python bench_make_gif.py [diagram.png]
+
+Defaults to out/uber_hld.png, upscaled to a few large canvas sizes.
+"""
+import os
+import sys
+import time
+
+from PIL import Image, ImageEnhance
+
+from sdvg.pipeline.make_gif import FADE_LEVELS, _fade_frames, _zoom_frame
+
+SCALES = [1.00, 1.02, 1.03, 1.02, 1.00]
+
+
+def legacy_frames(base: Image.Image) -> list:
+    # what png_to_gif_pulse(add_fade_in=True) did before
+    frames = []
+    for f in FADE_LEVELS:
+        frames.append(ImageEnhance.Brightness(base).enhance(f))
+    for s in SCALES:
+        w, h = base.size
+        nw, nh = int(w * s), int(h * s)
+        resized = base.resize((nw, nh), Image.Resampling.LANCZOS)
+        left, top = (nw - w) // 2, (nh - h) // 2
+        frames.append(resized.crop((left, top, left + w, top + h)))
+    return frames
+
+
+def batched_frames(base: Image.Image) -> list:
+    frames = _fade_frames(base, FADE_LEVELS)
+    zoomed = {}
+    for s in SCALES:
+        if s not in zoomed:
+            zoomed[s] = _zoom_frame(base, s)
+        frames.append(zoomed[s])
+    return frames
+
+
+def bench(fn, base: Image.Image, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn(base)
+        best = min(best, time.perf_counter() - t)
+    return best * 1000
+
+
+src = sys.argv[1] if len(sys.argv) > 1 else os.path.join("out", "uber_hld.png")
+diagram = Image.open(src).convert("RGBA")
+
+print(f"source: {src} {diagram.size[0]}x{diagram.size[1]}")
+for factor in (1, 2, 3):
+    base = diagram.resize((diagram.width * factor, diagram.height * factor), Image.Resampling.NEAREST)
+    old_ms = bench(legacy_frames, base)
+    new_ms = bench(batched_frames, base)
+    mp = base.width * base.height / 1e6
+    print(f"{base.width}x{base.height} ({mp:4.1f} MP): legacy {old_ms:7.1f} ms | batched {new_ms:7.1f} ms | x{old_ms / new_ms:.2f}")
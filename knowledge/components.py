@@ -35,29 +35,82 @@ TYPE_SYNONYMS: Dict[str, str] = {
     "rider app": "CLIENT",
     "driver app": "CLIENT",
     "web app": "CLIENT",
+    "client": "CLIENT",
+    "browser": "CLIENT",
 
     # gateways / networking
     "api gateway": "API_GATEWAY",
     "gateway": "API_GATEWAY",
     "load balancer": "LOAD_BALANCER",
     "lb": "LOAD_BALANCER",
+    "nginx": "LOAD_BALANCER",
+    "cdn": "CDN",
+    "cloudfront": "CDN",
 
     # storage
+    "database": "DB_REL",
     "postgres": "DB_REL",
+    "postgresql": "DB_REL",
     "mysql": "DB_REL",
     "sql": "DB_REL",
+    "nosql": "DB_NOSQL",
     "cassandra": "DB_NOSQL",
     "dynamodb": "DB_NOSQL",
     "mongodb": "DB_NOSQL",
+    "object store": "OBJECT_STORE",
+    "object storage": "OBJECT_STORE",
+    "blob storage": "OBJECT_STORE",
+    "s3": "OBJECT_STORE",
 
     # caching / queues
+    "cache": "CACHE",
     "redis": "CACHE",
     "memcached": "CACHE",
+    "message queue": "QUEUE",
+    "queue": "QUEUE",
     "kafka": "QUEUE",
     "rabbitmq": "QUEUE",
     "sqs": "QUEUE",
 
+    # observability
+    "monitoring": "MONITORING",
+    "prometheus": "MONITORING",
+
     # compute
     "service": "SERVICE",
     "microservice": "SERVICE",
 }
+
+
+# Types the diagram renderer draws (keys of render_diagram.TYPE_STYLE); kept
+# here so extraction code can target them without importing the renderer
+DIAGRAM_TYPES = (
+    "client application", "application", "client",
+    "gateway", "api gateway",
+    "core service", "service",
+    "database", "data store",
+    "cache", "cache/queue", "messaging system",
+    "security", "infrastructure",
+    "third-party service", "external service",
+)
+
+# Canonical type -> diagram type
+RENDER_TYPES: Dict[str, str] = {
+    "CLIENT": "client",
+    "API_GATEWAY": "api gateway",
+    "LOAD_BALANCER": "infrastructure",
+    "CDN": "infrastructure",
+    "SERVICE": "service",
+    "DB_REL": "database",
+    "DB_NOSQL": "database",
+    "CACHE": "cache",
+    "QUEUE": "messaging system",
+    "OBJECT_STORE": "data store",
+    "MONITORING": "security",
+}
+
+# Synonyms that name a kind, not a product ("cache" vs "redis")
+GENERIC_PHRASES = {
+    "client", "browser", "gateway", "database", "sql", "nosql", "cache",
+    "queue", "message queue", "object store", "object storage", "monitoring",
+}
@@ -0,0 +1,164 @@
+# sdvg/pipeline/browser_pool.py
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Iterable, List, Optional
+
+from playwright.sync_api import sync_playwright
+
+from sdvg.pipeline.http_client import DEFAULT_HEADERS
+
+
+BROWSER_POOL_SIZE = int(os.getenv("SDVG_BROWSER_POOL_SIZE", "2"))
+BROWSER_MAX_PAGES = int(os.getenv("SDVG_BROWSER_MAX_PAGES", "50"))
+# how long fetch() waits for a free browser, on top of the page's own timeout
+BROWSER_QUEUE_TIMEOUT_S = float(os.getenv("SDVG_BROWSER_QUEUE_TIMEOUT_S", "120"))
+
+# we only need the DOM; skip the heavy stuff
+BLOCKED_RESOURCE_TYPES = ("image", "font", "media")
+
+
+class BrowserPool:
+    """
+    A few warm headless Chromium instances for the scrape fallback.
+
+    Playwright's sync API is bound to the thread that started it, so every
+    browser lives on its own worker thread and callers hand work over through
+    a shared queue. Any number of threads (e.g. concurrent API requests) can
+    call fetch(); at most `size` pages render at once.
+
+    Each fetch gets a fresh, isolated browser context (no shared cookies or
+    storage). A browser is closed and relaunched after `max_pages` fetches to
+    keep its memory in check.
+    """
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        max_pages: int = BROWSER_MAX_PAGES,
+        block_resources: Iterable[str] = BLOCKED_RESOURCE_TYPES,
+    ):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self.block_resources = frozenset(block_resources)
+
+        self._jobs: queue.Queue = queue.Queue()
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _start_workers(self) -> None:
+        # caller holds self._lock
+        for i in range(self.size):
+            t = threading.Thread(target=self._worker, name=f"sdvg-browser-{i}", daemon=True)
+            t.start()
+            self._workers.append(t)
+
+    def fetch(self, url: str, timeout_ms: int = 30000, settle_ms: int = 1500) -> str:
+        """Render `url` in a pooled browser and return the page HTML."""
+        fut: Future = Future()
+        # same lock as close(): a job is either queued before the stop
+        # sentinels or refused, never stranded behind them
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BrowserPool is closed")
+            if not self._workers:
+                self._start_workers()
+            self._jobs.put((url, timeout_ms, settle_ms, fut))
+        try:
+            return fut.result(timeout=BROWSER_QUEUE_TIMEOUT_S + (timeout_ms + settle_ms) / 1000)
+        except TimeoutError:
+            fut.cancel()  # a worker that hasn't picked it up yet will skip it
+            raise TimeoutError(f"browser fetch of {url} did not finish in time") from None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        for _ in workers:
+            self._jobs.put(None)
+        for t in workers:
+            t.join(timeout=10)
+
+    # ---------- worker side (owns one playwright + browser) ----------
+    def _route(self, route) -> None:
+        if route.request.resource_type in self.block_resources:
+            route.abort()
+        else:
+            route.continue_()
+
+    def _render(self, browser, url: str, timeout_ms: int, settle_ms: int) -> str:
+        context = browser.new_context(
+            user_agent=DEFAULT_HEADERS["User-Agent"],
+            locale="en-US",
+        )
+        try:
+            if self.block_resources:
+                context.route("**/*", self._route)
+            page = context.new_page()
+            page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+            page.wait_for_timeout(settle_ms)  # let content settle
+            return page.content()
+        finally:
+            context.close()
+
+    def _worker(self) -> None:
+        pw = None
+        browser = None
+        served = 0
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    break
+                url, timeout_ms, settle_ms, fut = job
+                if not fut.set_running_or_notify_cancel():
+                    continue
+
+                try:
+                    if pw is None:
+                        pw = sync_playwright().start()
+                    if browser is None or not browser.is_connected():
+                        browser = pw.chromium.launch(headless=True)
+                        served = 0
+                    fut.set_result(self._render(browser, url, timeout_ms, settle_ms))
+                except Exception as e:
+                    fut.set_exception(e)
+
+                served += 1
+                if browser is not None and served >= self.max_pages:
+                    # recycle to cap long-lived chromium memory
+                    try:
+                        browser.close()
+                    except Exception:
+                        pass
+                    browser = None
+        finally:
+            if browser is not None:
+                try:
+                    browser.close()
+                except Exception:
+                    pass
+            if pw is not None:
+                pw.stop()
+
+
+_pool_lock = threading.Lock()
+_pool: Optional[BrowserPool] = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """Process-wide browser pool (started lazily, closed at exit)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BrowserPool()
+                atexit.register(_pool.close)
+    return _pool
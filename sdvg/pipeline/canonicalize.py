@@ -0,0 +1,251 @@
+# sdvg/pipeline/canonicalize.py
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from knowledge.components import DIAGRAM_TYPES, GENERIC_PHRASES, RENDER_TYPES, TYPE_SYNONYMS
+
+
+# free-form type words -> diagram type, for types no synonym covers;
+# checked in order, first hit wins
+TYPE_KEYWORDS: List[Tuple[Tuple[str, ...], str]] = [
+    (("third party", "third-party", "external", "provider"), "external service"),
+    (("auth", "security", "monitor", "logging", "observability", "metrics", "firewall"), "security"),
+    (("queue", "stream", "broker", "pub/sub", "pubsub", "messaging", "event bus"), "messaging system"),
+    (("cache",), "cache"),
+    (("database", "db", "sql", "table"), "database"),
+    (("storage", "store", "bucket", "blob", "warehouse", "lake"), "data store"),
+    (("balancer", "cdn", "dns", "proxy", "network", "infrastructure"), "infrastructure"),
+    (("gateway",), "api gateway"),
+    (("client", "app", "ui", "frontend", "browser", "user"), "client"),
+    (("service", "server", "worker", "engine", "api", "backend", "processor"), "service"),
+    # after "service": an "index service" is a service, a "search index" holds data
+    (("index",), "data store"),
+]
+
+# diagram types that draw the same thing; folded so duplicates line up
+TYPE_ALIASES: Dict[str, str] = {
+    "gateway": "api gateway",
+    "client application": "client",
+    "application": "client",
+    "core service": "service",
+    "third-party service": "external service",
+}
+
+# synonyms that name a kind of node rather than a product
+_KIND_PHRASES = GENERIC_PHRASES | {"api gateway", "load balancer", "lb", "cdn", "service", "microservice"}
+
+# words that say what a node *is*, not which one it is
+_TYPE_WORDS = {
+    "service", "services", "server", "cluster", "layer", "system", "component",
+    "db", "database", "store", "storage", "cache", "queue", "the",
+}
+
+# may sit next to a product name without making it a different node
+# ("Amazon S3", "Apache Kafka Cluster")
+_QUALIFIER_WORDS = _TYPE_WORDS | {
+    "amazon", "aws", "apache", "google", "gcp", "azure",
+    "message", "broker", "bucket", "instance", "primary", "replica",
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _build_index() -> Tuple[re.Pattern, Dict[str, str]]:
+    phrases = sorted(TYPE_SYNONYMS, key=len, reverse=True)  # longest first
+    pattern = re.compile(r"\b(" + "|".join(re.escape(p) for p in phrases) + r")s?\b")
+    return pattern, dict(TYPE_SYNONYMS)
+
+
+# one pass over a name finds every synonym in it
+_SYNONYM_RE, _SYNONYM_KIND = _build_index()
+
+
+def _words(s: str) -> List[str]:
+    return _WORD.findall((s or "").lower().replace("_", " "))
+
+
+def _synonyms_in(text: str) -> List[str]:
+    return [m.group(1) for m in _SYNONYM_RE.finditer(" ".join(_words(text)))]
+
+
+def canonical_type(type_str: str, name: str = "") -> str:
+    """Map a free-form component type (falling back on its name) to a diagram type."""
+    t = (type_str or "").strip().lower()
+    if t in DIAGRAM_TYPES:
+        return TYPE_ALIASES.get(t, t)
+
+    for text in (type_str, name):
+        for phrase in _synonyms_in(text):
+            kind = _SYNONYM_KIND[phrase]
+            if kind != "SERVICE" and kind in RENDER_TYPES:
+                return RENDER_TYPES[kind]
+
+        low = (text or "").lower()
+        words = set(_words(text))
+        for keys, style in TYPE_KEYWORDS:
+            if any((k in words) if k.isalnum() else (k in low) for k in keys):
+                return style
+
+    return t or "service"
+
+
+def _product_key(name: str) -> Optional[str]:
+    """
+    The product a name refers to, if that is all it names: "Redis Cache"
+    and "Amazon S3" are Redis and S3, but "Kafka Consumer Service" is a
+    service of its own that happens to mention Kafka.
+    """
+    text = " ".join(_words(name))
+    for m in _SYNONYM_RE.finditer(text):
+        phrase = m.group(1)
+        if phrase in _KIND_PHRASES or _SYNONYM_KIND[phrase] in ("SERVICE", "CLIENT"):
+            continue
+        others = (text[: m.start()] + " " + text[m.end():]).split()
+        return phrase if all(w in _QUALIFIER_WORDS for w in others) else None
+    return None
+
+
+def _entity_key(c: Dict[str, Any], ctype: str) -> Tuple[str, bool]:
+    """
+    (key, generic). Components with the same key are the same thing.
+
+    - names only a product (redis, "Kafka Cluster", ...) -> that product
+    - only names a kind ("Gateway", "API Gateway", "The Cache") -> one key per type
+    - otherwise -> the name minus type words ("Trip Service" == "trip",
+      "Kafka Consumer Service" == "kafka consumer")
+    """
+    name = c.get("name") or c.get("id") or ""
+    product = _product_key(name)
+    if product is not None:
+        return product, False
+
+    words = _words(name)
+    rest = " ".join(w for w in words if w not in _TYPE_WORDS)
+    if not rest or rest in _KIND_PHRASES or " ".join(words) in _KIND_PHRASES:
+        return f"type:{ctype}", True
+    return f"{rest}|{ctype}", False
+
+
+def _majority(values: List[str]) -> str:
+    values = [v for v in values if v]
+    if not values:
+        return ""
+    counts = Counter(values)
+    best = max(counts.values())
+    return next(v for v in values if counts[v] == best)
+
+
+def _group(components: List[Dict[str, Any]]) -> List[List[Tuple[int, Dict[str, Any], str, bool]]]:
+    """
+    Components grouped into entities, each group as [(position, component,
+    canonical type, generic)] in position order; groups follow their first
+    member's position.
+    """
+    groups: Dict[str, List[Tuple[int, Dict[str, Any], str, bool]]] = {}
+    generic_keys = set()
+    for pos, c in enumerate(components):
+        ctype = canonical_type(c.get("type", ""), c.get("name", ""))
+        key, generic = _entity_key(c, ctype)
+        if generic:
+            generic_keys.add(key)
+        groups.setdefault(key, []).append((pos, c, ctype, generic))
+
+    # "Cache" + "Redis" -> Redis, but only when the match is unambiguous
+    for key in generic_keys:
+        ctype = key.split(":", 1)[1]
+        specific = [k for k, ms in groups.items() if k not in generic_keys and ms[0][2] == ctype]
+        if len(specific) == 1:
+            groups[specific[0]] += groups.pop(key)
+
+    return [
+        sorted(members, key=lambda m: m[0])
+        for members in sorted(groups.values(), key=lambda ms: min(m[0] for m in ms))
+    ]
+
+
+def canonicalize_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Entity resolution for an extracted spec (run after enforce_grounding).
+
+    - component types are mapped onto the diagram types (DIAGRAM_TYPES)
+    - near-duplicates are merged: "Redis Cache" + "redis", "API Gateway" +
+      "gateway", "Trip Service" + "trip service"; a generic node ("Cache")
+      folds into the one specific node of its type when there is exactly one
+    - edges are rewritten to the surviving ids, self-loops dropped, and
+      repeats of the same (from, to) collapsed with their sources unioned
+
+    The first member of each group keeps its id; the longest specific name
+    wins.
+    Returns a new dict, the input is not modified.
+    """
+    id_map: Dict[str, str] = {}
+    components = []
+    for members in _group(spec.get("components", [])):
+        first = members[0][1]
+        keep_id = first.get("id", "")
+        urls: List[str] = []
+        for _, m, _, _ in members:
+            id_map[m.get("id", "")] = keep_id
+            urls += [u for u in m.get("source_urls") or [] if u not in urls]
+        # "Kafka" beats "Message Queue" however long the generic name is
+        named = [m for m in members if not m[3]] or members
+        names = [m.get("name", "") for _, m, _, _ in named]
+        descriptions = [m.get("description", "") for _, m, _, _ in members]
+        components.append({
+            **first,
+            "id": keep_id,
+            "name": max(names, key=len) or keep_id,
+            "type": _majority([t for _, _, t, _ in members]),
+            "description": max(descriptions, key=len),
+            "source_urls": urls,
+        })
+
+    relationships = []
+    by_pair: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for r in spec.get("relationships", []):
+        a = id_map.get(r.get("from_id", ""))
+        b = id_map.get(r.get("to_id", ""))
+        if a is None or b is None or a == b:
+            continue
+        existing: Optional[Dict[str, Any]] = by_pair.get((a, b))
+        if existing is not None:
+            existing["source_urls"] += [u for u in r.get("source_urls") or [] if u not in existing["source_urls"]]
+            continue
+        edge = {**r, "from_id": a, "to_id": b, "source_urls": list(r.get("source_urls") or [])}
+        by_pair[(a, b)] = edge
+        relationships.append(edge)
+
+    return {**spec, "components": components, "relationships": relationships}
+
+
+def canonicalize_partials(partials: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    canonicalize_spec for per-page specs that are about to be merged: the
+    entities are resolved across all pages first, so "Redis" on one page and
+    "Redis Cache" / "Cache" on others get the same id and their edges count
+    as the same edge in the merge vote.
+    """
+    flat = [(i, c) for i, spec in enumerate(partials) for c in spec.get("components", [])]
+    keep: Dict[Tuple[int, str], str] = {}  # (page, id) -> id of the entity's first member
+    for members in _group([c for _, c in flat]):
+        keep_id = members[0][1].get("id", "")
+        for pos, c, _, _ in members:
+            keep[(flat[pos][0], c.get("id", ""))] = keep_id
+
+    out = []
+    for i, spec in enumerate(partials):
+        def rename(cid: str) -> str:
+            return keep.get((i, cid), cid)
+
+        out.append(canonicalize_spec({
+            **spec,
+            "components": [{**c, "id": rename(c.get("id", ""))} for c in spec.get("components", [])],
+            "relationships": [
+                {**r, "from_id": rename(r.get("from_id", "")), "to_id": rename(r.get("to_id", ""))}
+                for r in spec.get("relationships", [])
+            ],
+        }))
+    return out
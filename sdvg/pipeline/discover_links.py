@@ -1,8 +1,22 @@
-from ddgs import DDGS
-from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
-import requests
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Optional
 import re
 
+from sdvg.pipeline.http_client import FetchResult, fetch
+from sdvg.pipeline.keywords import (
+    HLD_HINTS,
+    HTML_IMAGE_HINTS,
+    LIGHT_SIGNALS,
+    LLD_HINTS,
+    SCORE_SIGNALS,
+    SIGNAL_MATCHER,
+    URL_BAD_HINTS,
+    URL_GOOD_HINTS,
+    topic_matcher,
+)
+from sdvg.pipeline.search import search_many
+from sdvg.pipeline.urls import _canonical_url, _host
+
 
 BLOCKED_DOMAINS = {
     # video/social
@@ -39,43 +53,6 @@ BAD_URL_SUBSTRINGS = [
     "bing.com/aclick", "aclick?", "msclkid=", "utm_", "gclid=", "fbclid=",
 ]
 
-TRACKING_KEYS_PREFIX = ("utm_",)
-TRACKING_KEYS_EXACT = {"gclid", "fbclid", "msclkid", "yclid", "mc_cid", "mc_eid"}
-
-def _canonical_url(url: str) -> str:
-    """
-    Remove tracking query params and normalize scheme/host/path.
-    """
-    try:
-        p = urlparse(url)
-        # drop fragment
-        fragment = ""
-
-        # clean query params
-        q = []
-        for k, v in parse_qsl(p.query, keep_blank_values=True):
-            lk = k.lower()
-            if lk in TRACKING_KEYS_EXACT:
-                continue
-            if any(lk.startswith(pref) for pref in TRACKING_KEYS_PREFIX):
-                continue
-            q.append((k, v))
-        query = urlencode(q, doseq=True)
-
-        # normalize: lowercase hostname, strip trailing slash
-        netloc = (p.hostname or "").lower()
-        if p.port:
-            netloc = f"{netloc}:{p.port}"
-
-        path = p.path or ""
-        if path != "/":
-            path = path.rstrip("/")
-
-        clean = urlunparse((p.scheme or "https", netloc, path, p.params, query, fragment))
-        return clean
-    except Exception:
-        return url
-
 def _filter_by_domain(urls: list[str], max_per_domain: int = 1) -> list[str]:
     out = []
     counts: dict[str, int] = {}
@@ -90,57 +67,114 @@ def _filter_by_domain(urls: list[str], max_per_domain: int = 1) -> list[str]:
         out.append(u)
     return out
 
-LIGHT_SIGNALS = [
-    "system design", "system architecture", "high level", "low level",
-    "architecture diagram", "data flow", "request flow", "components",
-    "api gateway", "load balancer", "cache", "database", "queue",
-    "microservice", "latency", "throughput", "scalability", "tradeoff"
-]
+# Light scoring only needs title/headings/early body
+LIGHT_MAX_BYTES = 64 * 1024
+# returned links whose light fetch was cut short are downloaded in full
+# (same cap as scrape) so scrape_url can reuse the body
+FINALIST_MAX_BYTES = 3 * 1024 * 1024
+LIGHT_DEADLINE_S = 8.0
+LIGHT_WORKERS = 8
+
+_LIGHT_KEYWORDS = LIGHT_SIGNALS + HTML_IMAGE_HINTS + ["diagram", "architecture"]
+
 
-def _light_score_url(url: str, headers: dict, timeout: int = 12) -> int:
+def _light_fetch_and_score(
+    url: str,
+    headers: Optional[dict] = None,
+    timeout: int = 12,
+    max_bytes: Optional[int] = LIGHT_MAX_BYTES,
+) -> tuple[int, Optional[FetchResult]]:
     """
     Quick fetch and score based on presence of system design signals in title/h tags/first text.
-    Returns -inf-ish score on failure.
+    Only the first `max_bytes` of the page are downloaded and scored.
+    Returns (-inf-ish score, None) on failure; otherwise the score plus the
+    fetched response (result.truncated tells whether it stopped at max_bytes).
     """
     try:
-        r = requests.get(url, headers=headers, timeout=timeout)
+        r = fetch(url, headers=headers, timeout=timeout, max_bytes=max_bytes)
         if r.status_code >= 400:
-            return -999
+            return -999, None
 
-        html = r.text.lower()
-        score = 0
-        for kw in LIGHT_SIGNALS:
-            if kw in html:
-                score += 1
+        body = r.content[:max_bytes] if max_bytes else r.content
+        html = body.decode(r.encoding or "utf-8", errors="replace")
+        # one matcher pass gives every signal we need
+        hits = SIGNAL_MATCHER.present(html, only=_LIGHT_KEYWORDS)
+        score = sum(1 for kw in LIGHT_SIGNALS if kw in hits)
 
         # small bonus if it likely contains diagrams/images
-        if "<img" in html:
+        if "<img" in hits:
             score += 2
-        if "diagram" in html or "architecture" in html:
+        if "diagram" in hits or "architecture" in hits:
             score += 2
 
-        return score
+        return score, r
     except Exception:
-        return -999
+        return -999, None
+
+
+def _light_score_url(url: str, headers: Optional[dict] = None, timeout: int = 12) -> int:
+    return _light_fetch_and_score(url, headers=headers, timeout=timeout)[0]
+
 
 def _rerank_with_light_scrape(
     urls: list[str],
-    headers: dict,
+    headers: Optional[dict] = None,
     top_n: int = 10,
+    prefetched: Optional[Dict[str, FetchResult]] = None,
+    deadline_s: float = LIGHT_DEADLINE_S,
+    max_workers: int = LIGHT_WORKERS,
+    max_bytes: Optional[int] = LIGHT_MAX_BYTES,
 ) -> list[str]:
+    """
+    Light-score the top candidates concurrently, bounded by one overall deadline.
+    Scored pages come first (by light score); candidates still pending at the
+    deadline keep their search-score order after them instead of blocking.
+    If `prefetched` is given, it is filled with url -> FetchResult for every
+    page that was light-fetched (possibly truncated).
+    """
+    cands = urls[:top_n]
+    if not cands:
+        return []
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(cands))), thread_name_prefix="sdvg-light")
+    futures = [pool.submit(_light_fetch_and_score, u, headers, 12, max_bytes) for u in cands]
+    wait(futures, timeout=deadline_s)
+    # don't wait for stragglers; their results are simply ignored
+    pool.shutdown(wait=False, cancel_futures=True)
+
     scored = []
-    for u in urls[:top_n]:
-        s = _light_score_url(u, headers=headers)
+    late = []
+    for u, fut in zip(cands, futures):
+        if not fut.done() or fut.cancelled():
+            late.append(u)
+            continue
+        s, r = fut.result()
         scored.append((s, u))
+        if prefetched is not None and r is not None:
+            prefetched[u] = r
     scored.sort(key=lambda x: x[0], reverse=True)
-    return [u for s, u in scored if s > -999]
+    return [u for s, u in scored if s > -999] + late
 
 
-def _host(url: str) -> str:
+def _complete_fetch(url: str) -> Optional[FetchResult]:
     try:
-        return (urlparse(url).hostname or "").lower()
+        r = fetch(url, timeout=25, max_bytes=FINALIST_MAX_BYTES)
     except Exception:
-        return ""
+        return None  # scrape_url will try again with its own retries
+    return r if r.status_code < 400 else None
+
+
+def _complete_truncated(fetched: Dict[str, FetchResult], urls: list[str]) -> None:
+    """Finish, concurrently, the downloads the light rerank stopped at LIGHT_MAX_BYTES."""
+    todo = [u for u in urls if u in fetched and fetched[u].truncated]
+    for u in todo:
+        del fetched[u]
+    if not todo:
+        return
+    with ThreadPoolExecutor(max_workers=len(todo), thread_name_prefix="sdvg-finalist") as pool:
+        for u, r in zip(todo, pool.map(_complete_fetch, todo)):
+            if r is not None:
+                fetched[u] = r
 
 
 def _is_bad_url(url: str) -> bool:
@@ -191,16 +225,19 @@ def _topic_signals(topic: str) -> list[str]:
     return out
 
 def _topic_match_score(topic: str, url: str, title: str, body: str) -> int:
-    hay = f"{url} {title} {body}".lower()
     sigs = _topic_signals(topic)
+    if not sigs:
+        return 0
+
+    matcher = topic_matcher(tuple(sigs))
+    strong = matcher.present(f"{url} {title}")
+    hay = strong | matcher.present(body)
 
     score = 0
     for s in sigs:
-        if not s:
-            continue
         if s in hay:
             # strong boost if in url/title
-            if s in f"{url} {title}".lower():
+            if s in strong:
                 score += 6
             else:
                 score += 3
@@ -223,21 +260,21 @@ def _contains_topic(topic_terms: list[str], url: str, title: str, body: str) ->
 """
 
 def _url_quality_score(url: str) -> int:
-    u = url.lower()
+    hits = SIGNAL_MATCHER.present(url, only=_URL_KEYWORDS)
     score = 0
     # Good “article-ish” hints
-    for good in ["/blog", "/post", "/p/", "/guides", "system-design", "architecture", "interview"]:
-        if good in u:
-            score += 2
+    score += 2 * sum(1 for good in URL_GOOD_HINTS if good in hits)
     # Bad hints
-    for bad in ["template", "download", "tool", "generator", "pricing", "login", "signup"]:
-        if bad in u:
-            score -= 3
+    score -= 3 * sum(1 for bad in URL_BAD_HINTS if bad in hits)
     return score
 
 
+_URL_KEYWORDS = URL_GOOD_HINTS + URL_BAD_HINTS
+_SCORE_KEYWORDS = ["system design", "architecture"] + HLD_HINTS + LLD_HINTS + SCORE_SIGNALS
+
+
 def _score(title: str, body: str, level: str, url: str, topic: str) -> int:
-    txt = f"{title} {body}".lower()
+    hits = SIGNAL_MATCHER.present(f"{title} {body}", only=_SCORE_KEYWORDS)
     level = level.upper()
     score = 0
 
@@ -245,25 +282,19 @@ def _score(title: str, body: str, level: str, url: str, topic: str) -> int:
     score += _topic_match_score(topic, url, title, body)
 
     # Strong system design relevance
-    if "system design" in txt:
+    if "system design" in hits:
         score += 8
-    if "architecture" in txt:
+    if "architecture" in hits:
         score += 4
 
     # Level hints
-    if "high level" in txt or "hld" in txt:
+    if any(h in hits for h in HLD_HINTS):
         score += (4 if level == "HLD" else 1)
-    if "low level" in txt or "lld" in txt:
+    if any(h in hits for h in LLD_HINTS):
         score += (4 if level == "LLD" else 1)
 
     # Signals
-    for kw in [
-        "components", "data flow", "request flow", "sequence",
-        "cache", "database", "queue", "load balancer", "api gateway",
-        "microservice", "services", "scalability", "consistency", "latency"
-    ]:
-        if kw in txt:
-            score += 2
+    score += 2 * sum(1 for kw in SCORE_SIGNALS if kw in hits)
 
     score += _url_quality_score(url)
 
@@ -296,26 +327,36 @@ def discover_links(
     max_links: int = 5,
     max_results_per_query: int = 12,
     allow_paywall: bool = True,
+    prefetched: Optional[Dict[str, FetchResult]] = None,
+    light_deadline_s: float = LIGHT_DEADLINE_S,
 ) -> list[str]:
+    """
+    Search, filter and rank links for a topic.
+    Pass a dict as `prefetched` to receive full bodies (url -> FetchResult)
+    for the returned links, so scrape_url doesn't have to download them
+    again. Pages larger than the light-rerank cap are completed here with a
+    second GET, so their first LIGHT_MAX_BYTES cross the wire twice; the
+    rest of the page is downloaded only once.
+    """
 
     queries = _build_queries(topic, level)
     candidates: list[tuple[int, str]] = []
 
-    with DDGS() as ddgs:
-        for q in queries:
-            for r in ddgs.text(q, max_results=max_results_per_query):
-                url = (r.get("href") or r.get("link") or "").strip()
-                title = (r.get("title") or "").strip()
-                body = (r.get("body") or r.get("snippet") or "").strip()
+    # all queries run concurrently; repeated (query, max_results) come from cache
+    for results in search_many(queries, max_results=max_results_per_query):
+        for r in results:
+            url = (r.get("href") or r.get("link") or "").strip()
+            title = (r.get("title") or "").strip()
+            body = (r.get("body") or r.get("snippet") or "").strip()
 
-                if not url:
-                    continue
-                if not _is_allowed(url, allow_paywall=allow_paywall):
-                    continue
+            if not url:
+                continue
+            if not _is_allowed(url, allow_paywall=allow_paywall):
+                continue
 
-                url = _canonical_url(url)
-                s = _score(title, body, level, url, topic)
-                candidates.append((s, url))
+            url = _canonical_url(url)
+            s = _score(title, body, level, url, topic)
+            candidates.append((s, url))
 
     candidates.sort(key=lambda x: x[0], reverse=True)
 
@@ -331,17 +372,18 @@ def discover_links(
     # 2) domain diversity
     ranked_urls = _filter_by_domain(ranked_urls, max_per_domain=1)
 
-    # 3) optional: light scrape rerank
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Referer": "https://www.google.com/",
-        "Connection": "keep-alive",
-    }
-
+    # 3) optional: light scrape rerank (shared pooled client + default headers)
+    fetched: Dict[str, FetchResult] = {}
     ranked_urls = _rerank_with_light_scrape(
-        ranked_urls, headers=headers, top_n=min(10, len(ranked_urls))
+        ranked_urls,
+        top_n=min(10, len(ranked_urls)),
+        prefetched=fetched,
+        deadline_s=light_deadline_s,
     )
 
-    return ranked_urls[:max_links]
+    links = ranked_urls[:max_links]
+    if prefetched is not None:
+        # only hand over bodies we're actually returning, complete ones only
+        _complete_truncated(fetched, links)
+        prefetched.update({u: fetched[u] for u in links if u in fetched})
+    return links
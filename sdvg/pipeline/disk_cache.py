@@ -0,0 +1,223 @@
+# sdvg/pipeline/disk_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+
+CACHE_ROOT = os.getenv("SDVG_CACHE_DIR", os.path.join(".cache", "sdvg"))
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    data: bytes
+    stored_at: float
+    expires_at: Optional[float] = None  # None = never expires
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.time() >= self.expires_at
+
+
+class DiskCache:
+    """
+    Small persistent key -> bytes cache with TTLs and size-bounded LRU eviction.
+
+    Each entry is two files under `root`: <digest>.bin (payload) and
+    <digest>.json (key, timestamps, caller metadata). The payload's mtime is
+    used as "last access", so LRU order survives restarts.
+    Safe to share between threads; writes are atomic (tmp file + os.replace).
+    """
+
+    def __init__(
+        self,
+        root: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        default_ttl: Optional[float] = None,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.RLock()
+        self._index: Dict[str, Tuple[int, float]] = {}  # digest -> (size, last_access)
+        self._total = 0
+
+        os.makedirs(root, exist_ok=True)
+        self._load_index()
+
+    # ---------- paths / index ----------
+    @staticmethod
+    def _digest(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _paths(self, digest: str) -> Tuple[str, str]:
+        base = os.path.join(self.root, digest[:2], digest)
+        return base + ".bin", base + ".json"
+
+    def _load_index(self) -> None:
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for f in os.scandir(sub.path):
+                if not f.name.endswith(".bin"):
+                    continue
+                st = f.stat()
+                digest = f.name[:-4]
+                self._index[digest] = (st.st_size, st.st_mtime)
+                self._total += st.st_size
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _drop(self, digest: str) -> None:
+        size, _ = self._index.pop(digest, (0, 0.0))
+        self._total -= size
+        for p in self._paths(digest):
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self) -> None:
+        if self._total <= self.max_bytes:
+            return
+        # oldest access first
+        for digest, _ in sorted(self._index.items(), key=lambda kv: kv[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            self._drop(digest)
+            self.evictions += 1
+
+    # ---------- public API ----------
+    def get(self, key: str, allow_expired: bool = False) -> Optional[CacheEntry]:
+        """
+        Return the entry for `key`, or None on a miss.
+        Expired entries count as misses unless allow_expired=True
+        (useful for conditional revalidation).
+        """
+        digest = self._digest(key)
+        data_path, meta_path = self._paths(digest)
+        with self._lock:
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    info = json.load(f)
+                with open(data_path, "rb") as f:
+                    data = f.read()
+            except (OSError, ValueError):
+                self.misses += 1
+                if digest in self._index:
+                    self._drop(digest)
+                return None
+
+            entry = CacheEntry(
+                key=info.get("key", key),
+                data=data,
+                stored_at=info.get("stored_at", 0.0),
+                expires_at=info.get("expires_at"),
+                meta=info.get("meta") or {},
+            )
+            if entry.key != key or (entry.expired and not allow_expired):
+                self.misses += 1
+                return None
+
+            now = time.time()
+            try:
+                os.utime(data_path, (now, now))
+            except OSError:
+                pass
+            self._index[digest] = (len(data), now)
+            self.hits += 1
+            return entry
+
+    def set(
+        self,
+        key: str,
+        data: bytes,
+        meta: Optional[Dict[str, Any]] = None,
+        ttl: Optional[float] = None,
+    ) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        info = {
+            "key": key,
+            "stored_at": now,
+            "expires_at": (now + ttl) if ttl is not None else None,
+            "meta": meta or {},
+        }
+        if len(data) > self.max_bytes:
+            # would evict everything else and still not fit; the old value
+            # is stale now, so it must not be served either
+            self.delete(key)
+            return
+
+        digest = self._digest(key)
+        data_path, meta_path = self._paths(digest)
+        with self._lock:
+            if digest in self._index:
+                self._total -= self._index[digest][0]
+            self._write_atomic(data_path, data)
+            self._write_atomic(meta_path, json.dumps(info).encode("utf-8"))
+            self._index[digest] = (len(data), now)
+            self._total += len(data)
+            self._evict()
+
+    def touch(
+        self,
+        key: str,
+        ttl: Optional[float] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Extend an entry's expiry (and optionally merge metadata) without rewriting its payload."""
+        ttl = self.default_ttl if ttl is None else ttl
+        digest = self._digest(key)
+        _, meta_path = self._paths(digest)
+        with self._lock:
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    info = json.load(f)
+            except (OSError, ValueError):
+                return
+            now = time.time()
+            info["stored_at"] = now
+            info["expires_at"] = (now + ttl) if ttl is not None else None
+            if meta:
+                info["meta"] = {**(info.get("meta") or {}), **meta}
+            self._write_atomic(meta_path, json.dumps(info).encode("utf-8"))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._drop(self._digest(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            for digest in list(self._index):
+                self._drop(digest)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+            }
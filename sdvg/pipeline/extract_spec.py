@@ -1,16 +1,19 @@
 from __future__ import annotations
-import time
-import random
-
 import json
-import os
-from typing import List, Dict, Any
+from concurrent.futures import Future
+from typing import List, Dict, Any, Iterator, Optional
 from dataclasses import dataclass
 
 from dotenv import load_dotenv
-from google import genai
 
+from sdvg.pipeline.canonicalize import canonicalize_partials, canonicalize_spec
+from sdvg.pipeline.heuristic_extract import heuristic_extract
+from sdvg.pipeline.llm_cache import get_llm_cache
+from sdvg.pipeline.llm_client import get_llm_client
+from sdvg.pipeline.merge_specs import merge_specs
+from sdvg.pipeline.passages import PROMPT_TOKEN_BUDGET, select_passages, split_budget
 from sdvg.pipeline.scrape import PageContent
+from sdvg.pipeline.spec_stream import IncrementalSpecParser
 
 load_dotenv()
 
@@ -60,15 +63,24 @@ SPEC_SCHEMA: Dict[str, Any] = {
 }
 
 
-def _build_prompt(topic: str, level: str, pages: List[PageContent]) -> str:
+def _build_prompt(
+    topic: str,
+    level: str,
+    pages: List[PageContent],
+    token_budget: int = PROMPT_TOKEN_BUDGET,
+) -> str:
+    pages = pages[:3]
+    # best passages per page instead of the first N chars (intros/nav are cheap to drop)
+    budgets = split_budget([p.text for p in pages], total=token_budget)
+
     chunks = []
-    for p in pages[:3]:
+    for p, budget in zip(pages, budgets):
         img_lines = "\n".join([f"- {img.src} (score={img.score})" for img in p.images[:5]])
         chunks.append(
             f"URL: {p.url}\n"
             f"TITLE: {p.title or ''}\n"
             f"TOP_IMAGES:\n{img_lines}\n"
-             f"TEXT:\n{p.text[:5000]}\n" #f"TEXT:\n{p.text}\n"
+            f"TEXT:\n{select_passages(topic, p.text, budget)}\n"
         )
 
     joined = "\n\n---\n\n".join(chunks)
@@ -119,62 +131,170 @@ def enforce_grounding(spec: dict, pages: list) -> dict:
     return spec
 
 
+# sent with every extraction call (and part of the cache key)
+GENERATION_CONFIG: Dict[str, Any] = {
+    "response_mime_type": "application/json",
+    "temperature": 0.1,
+}
+
+
+def _parse_spec_text(text: str) -> Dict[str, Any]:
+    text = text.strip()
+
+    # Gemini sometimes wraps JSON in ```json ... ```
+    if text.startswith("```"):
+        # remove first line ``` or ```json
+        text = "\n".join(text.splitlines()[1:])
+        # drop trailing ```
+        if text.strip().endswith("```"):
+            text = text.strip()[:-3].strip()
+
+    return json.loads(text)
+
+
+def _cached_spec(prompt: str, model: str, use_cache: bool) -> Optional[Dict[str, Any]]:
+    cache = get_llm_cache() if use_cache else None
+    cached = cache.get(model, prompt, GENERATION_CONFIG) if cache else None
+    # byte-identical request -> reuse the stored parse (fresh copy per get)
+    return cached[1] if cached is not None else None
+
+
+def _store_spec(prompt: str, model: str, use_cache: bool, raw: str) -> Dict[str, Any]:
+    spec = _parse_spec_text(raw)
+    cache = get_llm_cache() if use_cache else None
+    if cache is not None and all(k in spec for k in ("components", "relationships")):
+        cache.set(model, prompt, GENERATION_CONFIG, raw, spec)
+    return spec
+
+
+def _generate_spec(prompt: str, model: str, use_cache: bool = True) -> Dict[str, Any]:
+    """One model call (or cache hit) -> parsed, ungrounded spec."""
+    spec = _cached_spec(prompt, model, use_cache)
+    if spec is not None:
+        return spec
+    raw = get_llm_client().generate_sync(model, prompt, GENERATION_CONFIG)
+    return _store_spec(prompt, model, use_cache, raw)
+
+
+def _extract_map_reduce(
+    topic: str,
+    level: str,
+    pages: List[PageContent],
+    model: str,
+    use_cache: bool,
+) -> Dict[str, Any]:
+    """
+    Map: one small extraction call per page, all queued on the shared LLM
+    client at once (it enforces the in-flight / rate limits).
+    Reduce: merge the grounded partial specs deterministically (page order),
+    after canonicalizing them so edge votes count resolved entities.
+    """
+    client = get_llm_client()
+    prompts = [_build_prompt(topic, level, [p]) for p in pages]
+    cached: Dict[int, Dict[str, Any]] = {}
+    pending: Dict[int, Future] = {}
+    for i, prompt in enumerate(prompts):
+        spec = _cached_spec(prompt, model, use_cache)
+        if spec is not None:
+            cached[i] = spec
+        else:
+            pending[i] = client.submit(model, prompt, GENERATION_CONFIG)
+
+    partials = []
+    first_err = None
+    for i, (page, prompt) in enumerate(zip(pages, prompts)):
+        try:
+            if i in cached:
+                partial = cached[i]
+            else:
+                partial = _store_spec(prompt, model, use_cache, pending[i].result())
+            partials.append(enforce_grounding(partial, [page]))
+        except Exception as e:
+            first_err = first_err or e
+            print(f"[extract skipped] {page.url} -> {type(e).__name__}: {e}")
+
+    if not partials:
+        raise first_err or RuntimeError("No pages to extract from.")
+
+    return merge_specs(topic, level, canonicalize_partials(partials))
+
+
 def extract_spec(
     topic: str,
     level: str,
     pages: List[PageContent],
     model: str = "gemini-2.5-flash",
+    use_cache: bool = True,
+    mode: str = "single",
 ) -> Dict[str, Any]:
     """
     Returns a validated JSON object with components + relationships.
-    Requires GEMINI_API_KEY in env.
-    """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise RuntimeError("Missing GEMINI_API_KEY. Put it in .env and restart your terminal.")
+    Requires GEMINI_API_KEY in env (unless the response is already cached).
 
-    client = genai.Client(api_key=api_key)
-
-    prompt = _build_prompt(topic, level, pages)
+    mode="single"     one prompt built from the top 3 pages
+    mode="map_reduce" one prompt per page (all pages), run concurrently and
+                      merged; latency is bounded by the slowest page
+    mode="heuristic"  no model call: phrase/verb matching over the knowledge
+                      tables (heuristic_extract); instant, coarser
 
-    # --- Gemini call with retries + longer timeout ---
-    last_err = None
-    for attempt in range(4):
-        try:
-            resp = client.models.generate_content(
-                model=model,
-                contents=prompt,
-                config={
-                    "response_mime_type": "application/json",
-                    "temperature": 0.1,
-                },
-            )
-            break
-        except Exception as e:
-            last_err = e
-            time.sleep((2 ** attempt) + random.random())
+    Model calls go through the shared rate-limited client (llm_client).
+    """
+    if mode == "single":
+        spec = _generate_spec(_build_prompt(topic, level, pages), model, use_cache)
+    elif mode == "map_reduce":
+        spec = _extract_map_reduce(topic, level, pages, model, use_cache)
+    elif mode == "heuristic":
+        spec = heuristic_extract(topic, level, pages)
     else:
-        raise last_err
+        raise ValueError("mode must be 'single', 'map_reduce' or 'heuristic'")
 
+    spec = enforce_grounding(spec, pages)
+    for k in ["topic", "level", "components", "relationships"]:
+        if k not in spec:
+            raise ValueError(f"Missing key in model output: {k}")
 
+    # merge near-duplicate nodes + map types onto the renderer's styles
+    return canonicalize_spec(spec)
 
-    text = resp.text.strip()
 
-    # Gemini sometimes wraps JSON in ```json ... ```
-    if text.startswith("```"):
-        # remove first line ``` or ```json
-        text = "\n".join(text.splitlines()[1:])
-        # drop trailing ```
-        if text.strip().endswith("```"):
-            text = text.strip()[:-3].strip()
+def extract_spec_stream(
+    topic: str,
+    level: str,
+    pages: List[PageContent],
+    model: str = "gemini-2.5-flash",
+    use_cache: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming version of extract_spec(mode="single").
+
+    Yields a grounded partial spec each time the response completes another
+    component or relationship, then the final spec (same result as
+    extract_spec). Partials only ever grow; an edge shows up once both of
+    its ends have. A cache hit yields the final spec straight away.
+    """
+    prompt = _build_prompt(topic, level, pages)
+    spec = _cached_spec(prompt, model, use_cache)
 
+    if spec is None:
+        parser = IncrementalSpecParser()
+        raw = []
+        emitted = (0, 0)
+        for chunk in get_llm_client().stream_sync(model, prompt, GENERATION_CONFIG):
+            raw.append(chunk)
+            if not any(kind in ("component", "relationship") for kind, _ in parser.feed(chunk)):
+                continue
+            partial = canonicalize_spec(enforce_grounding(parser.partial_spec(), pages))
+            partial["topic"] = partial["topic"] or topic
+            partial["level"] = partial["level"] or level
+            size = (len(partial["components"]), len(partial["relationships"]))
+            if size != emitted:
+                emitted = size
+                yield partial
+        # the full text is still the source of truth (and what gets cached)
+        spec = _store_spec(prompt, model, use_cache, "".join(raw))
 
-    #return json.loads(text)
-    spec = json.loads(text)
     spec = enforce_grounding(spec, pages)
     for k in ["topic", "level", "components", "relationships"]:
         if k not in spec:
             raise ValueError(f"Missing key in model output: {k}")
-    
-    return spec
-
+    yield canonicalize_spec(spec)
@@ -0,0 +1,219 @@
+# sdvg/pipeline/gif_writer.py
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from PIL import GifImagePlugin, Image, ImageChops
+
+PALETTE_COLORS = 255               # index 255 is reserved for "unchanged"
+TRANSPARENT_INDEX = 255
+PALETTE_SAMPLE_PX = 512 * 512      # per frame, larger frames are downscaled for the palette
+WEBP_QUALITY = 90
+
+_DISPOSE_NONE = 1                  # leave the frame in place; next one draws on top
+
+
+def _flatten(frame: Image.Image) -> Image.Image:
+    """RGB over white (diagram PNGs may carry alpha)."""
+    if frame.mode == "RGB":
+        return frame
+    frame = frame.convert("RGBA")
+    if frame.getextrema()[3][0] < 255:
+        frame = Image.alpha_composite(Image.new("RGBA", frame.size, (255, 255, 255, 255)), frame)
+    return frame.convert("RGB")
+
+
+def _fit(frame: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """Flattened frame centered on a white canvas of the animation size."""
+    frame = _flatten(frame)
+    if frame.size == size:
+        return frame
+    canvas = Image.new("RGB", size, (255, 255, 255))
+    canvas.paste(frame, ((size[0] - frame.width) // 2, (size[1] - frame.height) // 2))
+    return canvas
+
+
+def build_palette(frames: Iterable[Image.Image], colors: int = PALETTE_COLORS) -> Image.Image:
+    """
+    One palette for a whole animation: every frame (downscaled if huge) is
+    stacked into a strip and quantized once. Returns a "P" image with at
+    most `colors` entries, ready for Image.quantize(palette=...).
+    """
+    samples = []
+    for fr in frames:
+        fr = _flatten(fr)
+        ratio = (PALETTE_SAMPLE_PX / (fr.width * fr.height)) ** 0.5
+        if ratio < 1:
+            fr = fr.resize((max(1, int(fr.width * ratio)), max(1, int(fr.height * ratio))), Image.Resampling.NEAREST)
+        samples.append(fr)
+    if not samples:
+        raise ValueError("build_palette needs at least one frame")
+
+    strip = Image.new("RGB", (max(s.width for s in samples), sum(s.height for s in samples)), samples[0].getpixel((0, 0)))
+    y = 0
+    for s in samples:
+        strip.paste(s, (0, y))
+        y += s.height
+
+    # octree: fast, and keeps the few flat fills + antialiasing ramps of a diagram close
+    q = strip.quantize(colors=min(colors, PALETTE_COLORS), method=Image.Quantize.FASTOCTREE)
+    used = max(q.getextrema()[1], 0) + 1
+    palette = Image.new("P", (1, 1))
+    palette.putpalette(q.getpalette()[: 3 * used])  # short palette: index 255 stays free
+    return palette
+
+
+class GifWriter:
+    """
+    Streaming GIF encoder: one global palette, and after the first frame
+    only the changed rectangle is written (disposal 1 keeps the previous
+    frame under it). Inside the rectangle, unchanged pixels become a
+    transparent index when that encodes smaller (sparse changes, e.g. a
+    highlighted edge) and are written as-is when it doesn't (a zoom moves
+    nearly every pixel). A frame identical to the previous one only
+    extends its duration.
+
+    Holds one pending frame (its duration may still grow) plus the previous
+    frame's indices; memory does not depend on the frame count.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        size: Tuple[int, int],
+        palette: Image.Image,
+        loop: int = 0,
+    ):
+        self.path = str(path)
+        self.size = size
+        self.palette = palette
+        self.frames = 0
+
+        self._fp: Optional[BinaryIO] = open(self.path, "wb")
+        self._prev: Optional[Image.Image] = None
+        # (region, offset, encoder params, encoded chunks)
+        self._pending: Optional[Tuple[Image.Image, Tuple[int, int], Dict[str, Any], List[bytes]]] = None
+
+        # global color table from the shared palette, padded to 256
+        rgb = palette.getpalette()[: 3 * PALETTE_COLORS]
+        head = Image.new("P", size, 0)
+        head.putpalette(rgb + [0, 0, 0] * (256 - len(rgb) // 3))
+        header, _ = GifImagePlugin.getheader(head, info={"loop": loop})
+        for chunk in header:
+            self._fp.write(chunk)
+
+    def __enter__(self) -> "GifWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _index(self, frame: Image.Image) -> Image.Image:
+        return _fit(frame, self.size).quantize(palette=self.palette, dither=Image.Dither.NONE)
+
+    @staticmethod
+    def _encode(region: Image.Image, offset: Tuple[int, int], params: Dict[str, Any]) -> List[bytes]:
+        return GifImagePlugin.getdata(region, offset=offset, **params)
+
+    def append(self, frame: Image.Image, duration_ms: int) -> None:
+        cur = self._index(frame)
+        params: Dict[str, Any] = {"duration": duration_ms, "disposal": _DISPOSE_NONE}
+
+        if self._prev is None:
+            self._flush()
+            self._pending = (cur, (0, 0), params, self._encode(cur, (0, 0), params))
+            self._prev = cur
+            return
+
+        diff = ImageChops.difference(self._prev, cur)
+        bbox = diff.getbbox()
+        if bbox is None:
+            region, offset, pending_params, _ = self._pending
+            pending_params = {**pending_params, "duration": pending_params["duration"] + duration_ms}
+            self._pending = (region, offset, pending_params, [])  # re-encoded on flush
+            return
+
+        offset = bbox[:2]
+        region = cur.crop(bbox)
+        best = (region, params, self._encode(region, offset, params))
+
+        holed = region.copy()
+        holed.paste(TRANSPARENT_INDEX, mask=diff.crop(bbox).point(lambda v: 255 if v == 0 else 0, "L"))
+        holed_params = {**params, "transparency": TRANSPARENT_INDEX}
+        holed_chunks = self._encode(holed, offset, holed_params)
+        if sum(map(len, holed_chunks)) < sum(map(len, best[2])):
+            best = (holed, holed_params, holed_chunks)
+
+        self._flush()
+        self._pending = (best[0], offset, best[1], best[2])
+        self._prev = cur
+
+    def _flush(self) -> None:
+        if self._pending is None:
+            return
+        region, offset, params, chunks = self._pending
+        for chunk in chunks or self._encode(region, offset, params):
+            self._fp.write(chunk)
+        self.frames += 1
+        self._pending = None
+
+    def close(self) -> None:
+        if self._fp is None:
+            return
+        self._flush()
+        self._fp.write(b";")
+        self._fp.close()
+        self._fp = None
+        self._prev = None
+
+
+def _durations(duration_ms: Union[int, Sequence[int]], n: int) -> List[int]:
+    if isinstance(duration_ms, int):
+        return [duration_ms] * n
+    if len(duration_ms) != n:
+        raise ValueError(f"{len(duration_ms)} durations for {n} frames")
+    return list(duration_ms)
+
+
+def save_animation(
+    frames: Sequence[Image.Image],
+    path: Union[str, Path],
+    duration_ms: Union[int, Sequence[int]] = 120,
+    loop: int = 0,
+) -> str:
+    """
+    Write frames as an animation; the format follows the extension:
+      .gif          shared palette + delta frames (GifWriter)
+      .webp         animated WebP (lossless; VP8L keeps diagram text crisp)
+      .png / .apng  animated PNG
+    Frames of different sizes are centered on the largest canvas.
+    """
+    if not frames:
+        raise ValueError("save_animation needs at least one frame")
+    path = str(path)
+    durations = _durations(duration_ms, len(frames))
+    size = (max(f.width for f in frames), max(f.height for f in frames))
+    ext = Path(path).suffix.lower()
+    rgb = [_fit(f, size) for f in frames]
+
+    if ext == ".gif":
+        # palette sampled from the padded frames, so the canvas white is in it
+        with GifWriter(path, size, build_palette(rgb), loop=loop) as w:
+            for frame, d in zip(rgb, durations):
+                w.append(frame, d)
+        return path
+
+    if ext == ".webp":
+        rgb[0].save(
+            path, format="WEBP", save_all=True, append_images=rgb[1:],
+            duration=durations, loop=loop, lossless=True, quality=WEBP_QUALITY,
+        )
+    elif ext in (".png", ".apng"):
+        rgb[0].save(
+            path, format="PNG", save_all=True, append_images=rgb[1:],
+            duration=durations, loop=loop, disposal=0, blend=0,
+        )
+    else:
+        raise ValueError(f"unsupported animation format: {ext!r} (use .gif, .webp or .png)")
+    return path
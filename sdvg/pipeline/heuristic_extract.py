@@ -0,0 +1,278 @@
+# sdvg/pipeline/heuristic_extract.py
+from __future__ import annotations
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from knowledge.components import COMPONENT_TYPES, GENERIC_PHRASES, RENDER_TYPES, TYPE_SYNONYMS
+from knowledge.relationships import EDGE_TYPES
+from sdvg.pipeline.scrape import PageContent
+
+
+KIND_NAMES: Dict[str, str] = {
+    "CLIENT": "Client",
+    "API_GATEWAY": "API Gateway",
+    "LOAD_BALANCER": "Load Balancer",
+    "CDN": "CDN",
+    "SERVICE": "Service",
+    "DB_REL": "Database",
+    "DB_NOSQL": "NoSQL Database",
+    "CACHE": "Cache",
+    "QUEUE": "Message Queue",
+    "OBJECT_STORE": "Object Store",
+    "MONITORING": "Monitoring",
+}
+
+# names .title() gets wrong
+DISPLAY_NAMES: Dict[str, str] = {
+    "api gateway": "API Gateway",
+    "lb": "Load Balancer",
+    "cdn": "CDN",
+    "s3": "S3",
+    "sqs": "SQS",
+    "mysql": "MySQL",
+    "postgresql": "PostgreSQL",
+    "mongodb": "MongoDB",
+    "dynamodb": "DynamoDB",
+    "rabbitmq": "RabbitMQ",
+    "cloudfront": "CloudFront",
+}
+
+# request-flow order, used to orient co-occurrence edges
+LAYER: Dict[str, int] = {
+    "CLIENT": 0, "CDN": 1, "LOAD_BALANCER": 2, "API_GATEWAY": 3, "SERVICE": 4,
+    "QUEUE": 5, "CACHE": 6, "DB_REL": 7, "DB_NOSQL": 7, "OBJECT_STORE": 7,
+    "MONITORING": 8,
+}
+
+# kinds that hold data rather than act on it; a verb between two of them
+# belongs to the clause's subject ("X writes to Postgres and reads Redis")
+DATA_KINDS = {"DB_REL", "DB_NOSQL", "CACHE", "OBJECT_STORE"}
+
+# verb between two adjacent mentions -> (edge type, short label); the verb
+# closest to the first mention wins
+VERB_PATTERNS: List[Tuple[re.Pattern, str, str]] = [
+    (re.compile(r"\b(writes?|stores?|persists?|saves?|inserts?|updates?)\b"), "WRITE", "writes"),
+    (re.compile(r"\b(reads?|quer(?:y|ies)|fetch(?:es)?|looks? up|retrieves?)\b"), "READ", "reads"),
+    (re.compile(r"\b(consumes?|subscribes?|listens?)\b"), "ASYNC_EVENT", "consumes"),
+    (re.compile(r"\b(publish(?:es)?|emits?|produces?|enqueues?|pushes)\b"), "ASYNC_EVENT", "publishes"),
+    (re.compile(r"\b(calls?|routes?|forwards?|sends?|requests?|invokes?|hits?|talks? to|connects? to|through)\b"), "SYNC_CALL", "calls"),
+]
+
+# "<word> service" names worth their own node ("matching service")
+_SERVICE_NAME = re.compile(r"\b([a-z][a-z0-9-]+) (?:micro)?service\b")
+_SERVICE_STOPWORDS = {
+    "a", "an", "the", "this", "that", "each", "every", "our", "your", "their", "its",
+    "one", "another", "other", "separate", "dedicated", "new", "web", "backend",
+    "external", "third-party", "of", "to", "and", "or", "is", "as", "by", "with", "in",
+    "on", "for", "from", "same", "single", "any", "micro", "s",
+}
+
+_SENTENCES = re.compile(r"(?<=[.!?])\s+|\n+")
+
+COOCCUR_WINDOW = 160        # chars between two mentions in one sentence
+COOCCUR_MIN_SUPPORT = 2     # sentences needed for a verb-less edge
+MAX_COMPONENTS = {"HLD": 12, "LLD": 20}
+
+
+def _phrase_regex() -> re.Pattern:
+    phrases = sorted(TYPE_SYNONYMS, key=len, reverse=True)  # longest first
+    return re.compile(r"\b(" + "|".join(re.escape(p) for p in phrases) + r")s?\b")
+
+
+_PHRASES = _phrase_regex()
+
+
+@dataclass
+class _Mention:
+    key: str            # component key (phrase or service name)
+    kind: str           # canonical knowledge type
+    start: int
+    end: int
+
+
+@dataclass
+class _Component:
+    key: str
+    kind: str
+    mentions: int = 0
+    first_seen: int = 0
+    urls: List[str] = field(default_factory=list)
+
+
+def _slug(s: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", s.lower()).strip("_")
+
+
+def _service_name(match: re.Match) -> Optional[str]:
+    word = match.group(1)
+    # a synonym is not a service name ("cache service" is the cache)
+    if word in _SERVICE_STOPWORDS or word in TYPE_SYNONYMS:
+        return None
+    return word + " service"
+
+
+def _mentions(sentence: str) -> List[_Mention]:
+    found: List[_Mention] = []
+    taken: List[Tuple[int, int]] = []
+
+    for m in _SERVICE_NAME.finditer(sentence):
+        name = _service_name(m)
+        if name:
+            found.append(_Mention(name, "SERVICE", m.start(), m.end()))
+            taken.append((m.start(), m.end()))
+
+    for m in _PHRASES.finditer(sentence):
+        phrase = m.group(1)
+        kind = TYPE_SYNONYMS[phrase]
+        if kind == "SERVICE" or kind not in COMPONENT_TYPES:
+            continue  # bare "service" says nothing; named ones handled above
+        if any(a <= m.start() < b for a, b in taken):
+            continue
+        found.append(_Mention(phrase, kind, m.start(), m.end()))
+
+    found.sort(key=lambda x: x.start)
+    return found
+
+
+def _verb_edge(between: str) -> Optional[Tuple[str, str]]:
+    best = None
+    for pattern, edge_type, label in VERB_PATTERNS:
+        m = pattern.search(between)
+        if m and (best is None or m.start() < best[0]):
+            best = (m.start(), edge_type, label)
+    return best[1:] if best else None
+
+
+def _cooccur_edge_type(to_kind: str) -> str:
+    if to_kind == "QUEUE":
+        return "ASYNC_EVENT"
+    if to_kind == "CACHE":
+        return "READ"
+    if to_kind in ("DB_REL", "DB_NOSQL", "OBJECT_STORE"):
+        return "WRITE"
+    return "SYNC_CALL"
+
+
+def _display_name(key: str, kind: str) -> str:
+    if key in GENERIC_PHRASES:
+        return KIND_NAMES[kind]
+    return DISPLAY_NAMES.get(key) or key.title()
+
+
+def heuristic_extract(topic: str, level: str, pages: List[PageContent]) -> Dict[str, Any]:
+    """
+    In-process spec extraction from the scraped text (no model call).
+
+    Components come from TYPE_SYNONYMS phrase hits plus "<x> service" names.
+    Relationships come from two mentions in one sentence: a verb between
+    them picks the edge type (writes/reads/publishes/calls); without a verb
+    the pair needs COOCCUR_MIN_SUPPORT sentences and is oriented client ->
+    data along LAYER. Output has the same shape as extract_spec's.
+    """
+    level = (level or "HLD").upper()
+    comps: Dict[str, _Component] = {}
+    verb_edges: Dict[Tuple[str, str], Counter] = {}
+    co_edges: Counter = Counter()
+    edge_urls: Dict[Tuple[str, str], List[str]] = {}
+    order = 0
+
+    per_sentence: List[Tuple[str, str, List[_Mention]]] = []
+    for p in pages:
+        for sentence in _SENTENCES.split((p.text or "").lower()):
+            ms = _mentions(sentence)
+            if not ms:
+                continue
+            per_sentence.append((p.url, sentence, ms))
+            for m in ms:
+                c = comps.get(m.key)
+                if c is None:
+                    c = comps[m.key] = _Component(m.key, m.kind, first_seen=order)
+                    order += 1
+                c.mentions += 1
+                if p.url not in c.urls:
+                    c.urls.append(p.url)
+
+    # fold generic mentions into the most-mentioned specific node of that kind
+    alias: Dict[str, str] = {k: k for k in comps}
+    for key, c in comps.items():
+        if key not in GENERIC_PHRASES:
+            continue
+        specific = [o for o in comps.values() if o.kind == c.kind and o.key not in GENERIC_PHRASES]
+        if specific:
+            target = max(specific, key=lambda o: (o.mentions, -o.first_seen))
+            alias[key] = target.key
+            target.mentions += c.mentions
+            target.urls += [u for u in c.urls if u not in target.urls]
+
+    kept = sorted(
+        (c for k, c in comps.items() if alias[k] == k),
+        key=lambda c: (-len(c.urls), -c.mentions, c.first_seen),
+    )[: MAX_COMPONENTS.get(level, 12)]
+    kept_keys = {c.key for c in kept}
+
+    for url, sentence, ms in per_sentence:
+        for i, a in enumerate(ms):
+            for j, b in enumerate(ms[i + 1:]):
+                ka, kb = alias[a.key], alias[b.key]
+                if ka == kb or ka not in kept_keys or kb not in kept_keys:
+                    continue
+                if b.start - a.end > COOCCUR_WINDOW:
+                    break
+                # verbs only link neighbours ("A calls B which writes to C")
+                verb = _verb_edge(sentence[a.end:b.start]) if j == 0 else None
+                if verb is not None and i > 0 and comps[ka].kind in DATA_KINDS and comps[kb].kind in DATA_KINDS:
+                    continue
+                if verb is not None:
+                    edge_type, label = verb
+                    pair = (kb, ka) if label == "consumes" else (ka, kb)
+                    verb_edges.setdefault(pair, Counter())[(edge_type, label)] += 1
+                else:
+                    ca, cb = comps[ka], comps[kb]
+                    if LAYER[ca.kind] == LAYER[cb.kind]:
+                        continue
+                    pair = (ka, kb) if LAYER[ca.kind] < LAYER[cb.kind] else (kb, ka)
+                    co_edges[pair] += 1
+                urls = edge_urls.setdefault(pair, [])
+                if url not in urls:
+                    urls.append(url)
+
+    ids = {c.key: _slug(c.key) for c in kept}
+    components = [
+        {
+            "id": ids[c.key],
+            "name": _display_name(c.key, c.kind),
+            "type": RENDER_TYPES.get(c.kind, "service"),
+            "description": f"{KIND_NAMES[c.kind]} mentioned {c.mentions}x in sources",
+            "source_urls": list(c.urls),
+        }
+        for c in sorted(kept, key=lambda c: c.first_seen)
+    ]
+
+    relationships = []
+    for pair, votes in verb_edges.items():
+        (edge_type, label), _ = votes.most_common(1)[0]
+        relationships.append((pair, edge_type, label))
+    for pair, n in co_edges.items():
+        if pair in verb_edges or (pair[1], pair[0]) in verb_edges or n < COOCCUR_MIN_SUPPORT:
+            continue
+        edge_type = _cooccur_edge_type(comps[pair[1]].kind)
+        relationships.append((pair, edge_type, EDGE_TYPES[edge_type].label))
+
+    return {
+        "topic": topic,
+        "level": level,
+        "components": components,
+        "relationships": [
+            {
+                "from_id": ids[a],
+                "to_id": ids[b],
+                "relation": edge_type,
+                "label": label,
+                "source_urls": edge_urls.get((a, b), []),
+            }
+            for (a, b), edge_type, label in relationships
+        ],
+    }
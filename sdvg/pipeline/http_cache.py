@@ -0,0 +1,128 @@
+# sdvg/pipeline/http_cache.py
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from sdvg.pipeline.disk_cache import CACHE_ROOT, CacheEntry, DiskCache
+from sdvg.pipeline.urls import _canonical_url
+
+
+HTTP_CACHE_ENABLED = os.getenv("SDVG_HTTP_CACHE", "1") != "0"
+HTTP_CACHE_DIR = os.path.join(CACHE_ROOT, "http")
+HTTP_CACHE_TTL = float(os.getenv("SDVG_HTTP_CACHE_TTL", str(6 * 3600)))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("SDVG_HTTP_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# response headers worth keeping alongside the body
+_KEEP_HEADERS = ("content-type", "etag", "last-modified", "cache-control")
+
+
+class ResponseCache:
+    """
+    On-disk cache of successful GET responses, keyed by canonical URL.
+
+    Fresh entries (younger than `ttl`) are served without touching the network.
+    Stale entries that carry an ETag / Last-Modified are revalidated with a
+    conditional request; a 304 just extends their lifetime.
+    Server max-age is intentionally ignored (many blogs send max-age=0);
+    only `no-store` is honored.
+    """
+
+    def __init__(self, store: DiskCache, ttl: float = HTTP_CACHE_TTL):
+        self.store = store
+        self.ttl = ttl
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """Cached entry for url (possibly stale, if it can be revalidated)."""
+        entry = self.store.get(_canonical_url(url), allow_expired=True)
+        if entry is None:
+            return None
+        if entry.expired and not self.validators(entry):
+            return None
+        return entry
+
+    @staticmethod
+    def validators(entry: CacheEntry) -> Dict[str, str]:
+        """Conditional request headers for a stale entry."""
+        h = entry.meta.get("headers") or {}
+        out = {}
+        if h.get("etag"):
+            out["If-None-Match"] = h["etag"]
+        if h.get("last-modified"):
+            out["If-Modified-Since"] = h["last-modified"]
+        return out
+
+    def save(
+        self,
+        url: str,
+        final_url: str,
+        status_code: int,
+        headers: Dict[str, str],
+        content: bytes,
+        encoding: Optional[str],
+    ) -> None:
+        lower = {k.lower(): v for k, v in (headers or {}).items()}
+        if status_code != 200 or "no-store" in lower.get("cache-control", "").lower():
+            return
+        meta: Dict[str, Any] = {
+            "url": final_url,
+            "status_code": status_code,
+            "encoding": encoding,
+            "headers": {k: lower[k] for k in _KEEP_HEADERS if k in lower},
+        }
+        self.store.set(_canonical_url(url), content, meta=meta, ttl=self.ttl)
+
+    def refresh(self, url: str, headers: Dict[str, str]) -> None:
+        """After a 304: keep the body, extend its TTL, pick up new validators."""
+        lower = {k.lower(): v for k, v in (headers or {}).items()}
+        entry = self.store.get(_canonical_url(url), allow_expired=True)
+        if entry is None:
+            return
+        kept = dict(entry.meta.get("headers") or {})
+        kept.update({k: lower[k] for k in ("etag", "last-modified") if k in lower})
+        self.store.touch(_canonical_url(url), ttl=self.ttl, meta={"headers": kept})
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            if outcome == "hit":
+                self.hits += 1
+            elif outcome == "revalidated":
+                self.revalidated += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.revalidated + self.misses
+            out = {
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "hit_rate": ((self.hits + self.revalidated) / lookups) if lookups else 0.0,
+            }
+        store = self.store.stats()
+        out.update({k: store[k] for k in ("entries", "bytes", "max_bytes", "evictions")})
+        return out
+
+
+_cache_lock = threading.Lock()
+_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide response cache, or None when disabled via SDVG_HTTP_CACHE=0."""
+    global _cache
+    if not HTTP_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    DiskCache(HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES, default_ttl=HTTP_CACHE_TTL)
+                )
+    return _cache
@@ -0,0 +1,276 @@
+# sdvg/pipeline/http_client.py
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from sdvg.pipeline.http_cache import get_response_cache
+
+
+# One set of browser-ish headers for every fetch (discovery + scrape)
+DEFAULT_HEADERS: Dict[str, str] = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://www.google.com/",
+    "Connection": "keep-alive",
+}
+
+# pool_connections = how many hosts keep a pool, pool_maxsize = keep-alive
+# connections per host (should be >= the number of concurrent fetch workers)
+POOL_CONNECTIONS = int(os.getenv("SDVG_HTTP_POOL_CONNECTIONS", "32"))
+POOL_MAXSIZE = int(os.getenv("SDVG_HTTP_POOL_MAXSIZE", "8"))
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_config = {
+    "pool_connections": POOL_CONNECTIONS,
+    "pool_maxsize": POOL_MAXSIZE,
+    "headers": dict(DEFAULT_HEADERS),
+}
+
+
+@dataclass
+class FetchResult:
+    """
+    A fetched (or cached) response body, detached from the connection.
+    Mirrors the bits of requests.Response the pipeline actually uses.
+    """
+    url: str
+    status_code: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    content: bytes = b""
+    encoding: Optional[str] = None
+    from_cache: bool = False
+    truncated: bool = False  # body was cut at max_bytes
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+class FetchRejected(Exception):
+    """A response was dropped before (or while) downloading its body."""
+
+    def __init__(self, url: str, reason: str):
+        super().__init__(f"{reason}: {url}")
+        self.url = url
+        self.reason = reason
+
+
+# early_check(head_bytes) -> rejection reason, or None to keep the page
+EarlyCheck = Callable[[bytes], Optional[str]]
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=_config["pool_connections"],
+        pool_maxsize=_config["pool_maxsize"],
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(_config["headers"])
+    return session
+
+
+def configure_http(
+    pool_connections: Optional[int] = None,
+    pool_maxsize: Optional[int] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> None:
+    """
+    Change pool sizes / default headers for the shared client.
+    The current session is closed and rebuilt lazily on next use.
+    """
+    global _session
+    with _lock:
+        if pool_connections is not None:
+            _config["pool_connections"] = pool_connections
+        if pool_maxsize is not None:
+            _config["pool_maxsize"] = pool_maxsize
+        if headers is not None:
+            _config["headers"] = {**DEFAULT_HEADERS, **headers}
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_session() -> requests.Session:
+    """
+    Process-wide session with keep-alive pools per host.
+    Shared by discover_links and scrape so repeated fetches (and repeated
+    runs inside the API server) reuse warm TCP/TLS connections.
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def http_get(
+    url: str,
+    timeout: float = 25,
+    headers: Optional[Dict[str, str]] = None,
+    **kwargs,
+) -> requests.Response:
+    """GET through the shared session; `headers` only override the defaults."""
+    return get_session().get(url, headers=headers, timeout=timeout, **kwargs)
+
+
+def _check_content_type(url: str, headers: Dict[str, str], allowed_types: Optional[tuple]) -> None:
+    if not allowed_types:
+        return
+    ctype = ""
+    for k, v in (headers or {}).items():
+        if k.lower() == "content-type":
+            ctype = v.split(";")[0].strip().lower()
+            break
+    # no header -> give it the benefit of the doubt
+    if ctype and ctype not in allowed_types:
+        raise FetchRejected(url, f"content-type {ctype}")
+
+
+def _run_check(url: str, early_check: EarlyCheck, head: bytes) -> None:
+    reason = early_check(head)
+    if reason:
+        raise FetchRejected(url, reason)
+
+
+def _read_capped(
+    r: requests.Response,
+    max_bytes: Optional[int],
+    early_check: Optional[EarlyCheck] = None,
+    check_bytes: int = 64 * 1024,
+) -> tuple[bytes, bool]:
+    """
+    Read a streamed body up to max_bytes; returns (body, truncated).
+    `early_check` sees the first `check_bytes` as soon as they arrive and can
+    abort the download by returning a reason (raises FetchRejected).
+    """
+    buf = bytearray()
+    checked = early_check is None
+    for chunk in r.iter_content(chunk_size=16 * 1024):
+        buf += chunk
+        if not checked and len(buf) >= check_bytes:
+            checked = True
+            _run_check(r.url, early_check, bytes(buf[:check_bytes]))
+        if max_bytes is not None and len(buf) >= max_bytes:
+            return bytes(buf[:max_bytes]), True
+    if not checked:
+        _run_check(r.url, early_check, bytes(buf))
+    return bytes(buf), False
+
+
+def check_response(result: "FetchResult", allowed_types: Optional[tuple], early_check: Optional[EarlyCheck], check_bytes: int) -> None:
+    """Same checks as the streaming path, for bodies we already have (cache / prefetch)."""
+    if result.status_code >= 400:
+        return
+    _check_content_type(result.url, result.headers, allowed_types)
+    if early_check is not None:
+        _run_check(result.url, early_check, result.content[:check_bytes])
+
+
+def fetch(
+    url: str,
+    timeout: float = 25,
+    headers: Optional[Dict[str, str]] = None,
+    use_cache: bool = True,
+    before_request: Optional[Callable[[], None]] = None,
+    max_bytes: Optional[int] = None,
+    allowed_types: Optional[tuple] = None,
+    early_check: Optional[EarlyCheck] = None,
+    check_bytes: int = 64 * 1024,
+) -> FetchResult:
+    """
+    GET `url` through the shared session and the on-disk response cache.
+
+    - fresh cache hit -> returned without any network I/O
+    - stale entry with ETag/Last-Modified -> conditional GET, 304 reuses the body
+    - otherwise a normal GET; complete 200 responses are stored for next time
+    `max_bytes` streams the body and stops after that many bytes
+    (result.truncated tells whether it was cut; truncated bodies aren't cached).
+    For successful responses, `allowed_types` is checked against Content-Type
+    before any body is read and `early_check` runs on the first `check_bytes`;
+    either one raises FetchRejected and stops the download.
+    `before_request` runs only when we actually hit the network
+    (e.g. scrape's politeness jitter).
+    """
+    cache = get_response_cache() if use_cache else None
+    entry = cache.lookup(url) if cache else None
+
+    if entry is not None and not entry.expired:
+        cache.record("hit")
+        result = _from_entry(url, entry)
+        check_response(result, allowed_types, early_check, check_bytes)
+        return result
+
+    req_headers = dict(headers or {})
+    if entry is not None:
+        req_headers.update(cache.validators(entry))
+
+    if before_request is not None:
+        before_request()
+
+    stream = max_bytes is not None or allowed_types is not None or early_check is not None
+    r = http_get(url, timeout=timeout, headers=req_headers or None, stream=stream)
+    try:
+        if entry is not None and r.status_code == 304:
+            cache.refresh(url, dict(r.headers))
+            cache.record("revalidated")
+            result = _from_entry(url, entry)
+            check_response(result, allowed_types, early_check, check_bytes)
+            return result
+
+        ok = r.status_code < 400
+        if ok:
+            _check_content_type(url, dict(r.headers), allowed_types)
+
+        if stream:
+            content, truncated = _read_capped(
+                r, max_bytes, early_check if ok else None, check_bytes
+            )
+            # apparent_encoding would read the rest of the body; let .text default to utf-8
+            encoding = r.encoding
+        else:
+            content, truncated = r.content, False
+            encoding = r.encoding or r.apparent_encoding
+    finally:
+        if stream:
+            r.close()
+
+    result = FetchResult(
+        url=r.url or url,
+        status_code=r.status_code,
+        headers=dict(r.headers),
+        content=content,
+        encoding=encoding,
+        truncated=truncated,
+    )
+    if cache is not None:
+        cache.record("miss")
+        if not truncated:
+            cache.save(url, result.url, result.status_code, result.headers, result.content, result.encoding)
+    return result
+
+
+def _from_entry(url: str, entry) -> FetchResult:
+    return FetchResult(
+        url=entry.meta.get("url") or url,
+        status_code=entry.meta.get("status_code", 200),
+        headers=dict(entry.meta.get("headers") or {}),
+        content=entry.data,
+        encoding=entry.meta.get("encoding"),
+        from_cache=True,
+    )
@@ -0,0 +1,126 @@
+# sdvg/pipeline/keywords.py
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+try:
+    # optional C extension (pip install pyahocorasick): true single-pass matching
+    import ahocorasick
+except ImportError:  # pragma: no cover - depends on environment
+    ahocorasick = None
+
+
+# ---------- keyword tables (shared by discovery + scrape scoring) ----------
+LIGHT_SIGNALS = [
+    "system design", "system architecture", "high level", "low level",
+    "architecture diagram", "data flow", "request flow", "components",
+    "api gateway", "load balancer", "cache", "database", "queue",
+    "microservice", "latency", "throughput", "scalability", "tradeoff"
+]
+
+DIAGRAM_HINTS = ["diagram", "architecture", "flow", "hld", "lld", "system design", "sequence"]
+PAYWALL_HINTS = [
+    "this post is for paid subscribers",
+    "subscribe to continue",
+    "sign in to read",
+    "become a member",
+    "purchase",
+    "already a paid subscriber",
+]
+
+# search-result scoring (_score)
+SCORE_SIGNALS = [
+    "components", "data flow", "request flow", "sequence",
+    "cache", "database", "queue", "load balancer", "api gateway",
+    "microservice", "services", "scalability", "consistency", "latency"
+]
+HLD_HINTS = ["high level", "hld"]
+LLD_HINTS = ["low level", "lld"]
+
+# url-shape hints (_url_quality_score)
+URL_GOOD_HINTS = ["/blog", "/post", "/p/", "/guides", "system-design", "architecture", "interview"]
+URL_BAD_HINTS = ["template", "download", "tool", "generator", "pricing", "login", "signup"]
+
+# obvious tiny/ui images (_image_relevance)
+IMAGE_NOISE_HINTS = ["sprite", "icon", "logo"]
+
+# raw-html bonus markers (_light_score_url)
+HTML_IMAGE_HINTS = ["<img"]
+
+
+class KeywordMatcher:
+    """
+    Counts occurrences of a fixed keyword set in lower-cased text.
+
+    Built once per keyword set. With pyahocorasick installed, one
+    Aho-Corasick pass over the text yields every count at once, so the cost
+    no longer grows with the number of keywords. Without it we fall back to
+    C-level substring scans on a single lowered copy, limited to the
+    keywords passed in `only` (same cost as the old per-function loops).
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        seen = []
+        for k in keywords:
+            k = (k or "").lower()
+            if k and k not in seen:
+                seen.append(k)
+        self.keywords: List[str] = seen
+        self._index = {k: i for i, k in enumerate(seen)}
+
+        self._automaton = None
+        if ahocorasick is not None and seen:
+            a = ahocorasick.Automaton()
+            for i, k in enumerate(seen):
+                a.add_word(k, i)
+            a.make_automaton()
+            self._automaton = a
+
+    @property
+    def backend(self) -> str:
+        return "aho-corasick" if self._automaton is not None else "substring"
+
+    def counts(
+        self,
+        text: str,
+        only: Optional[Iterable[str]] = None,
+        lowered: bool = False,
+    ) -> Dict[str, int]:
+        """
+        keyword -> number of occurrences (0 if absent).
+        `only` restricts the result to a subset of the matcher's keywords;
+        pass lowered=True if `text` is already lower-case.
+        """
+        t = text if lowered else (text or "").lower()
+        wanted = self.keywords if only is None else [k for k in only if k in self._index]
+
+        if self._automaton is None:
+            return {k: t.count(k) for k in wanted}
+
+        hits = [0] * len(self.keywords)
+        for _, i in self._automaton.iter(t):
+            hits[i] += 1
+        return {k: hits[self._index[k]] for k in wanted}
+
+    def present(self, text: str, only: Optional[Iterable[str]] = None, lowered: bool = False) -> set:
+        """Set of keywords that occur at least once."""
+        if self._automaton is None:
+            # `in` can stop at the first hit, unlike str.count
+            t = text if lowered else (text or "").lower()
+            wanted = self.keywords if only is None else [k for k in only if k in self._index]
+            return {k for k in wanted if k in t}
+        return {k for k, n in self.counts(text, only=only, lowered=lowered).items() if n}
+
+
+# the one matcher every page/result scorer shares
+SIGNAL_MATCHER = KeywordMatcher(
+    LIGHT_SIGNALS + DIAGRAM_HINTS + PAYWALL_HINTS + SCORE_SIGNALS + HLD_HINTS + LLD_HINTS
+    + URL_GOOD_HINTS + URL_BAD_HINTS + IMAGE_NOISE_HINTS + HTML_IMAGE_HINTS
+)
+
+
+@lru_cache(maxsize=128)
+def topic_matcher(signals: tuple) -> KeywordMatcher:
+    """Per-topic matcher (topic signals aren't known until a request comes in)."""
+    return KeywordMatcher(signals)
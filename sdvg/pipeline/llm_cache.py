@@ -0,0 +1,82 @@
+# sdvg/pipeline/llm_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from sdvg.pipeline.disk_cache import CACHE_ROOT, DiskCache
+
+
+LLM_CACHE_ENABLED = os.getenv("SDVG_LLM_CACHE", "1") != "0"
+LLM_CACHE_DIR = os.path.join(CACHE_ROOT, "llm")
+LLM_CACHE_TTL = float(os.getenv("SDVG_LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("SDVG_LLM_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+
+
+def llm_cache_key(model: str, prompt: str, config: Dict[str, Any]) -> str:
+    """Content address of one generation request."""
+    blob = json.dumps(
+        {"model": model, "prompt": prompt, "config": config},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return "llm:" + hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Persistent (model, prompt, generation config) -> (raw response, parsed spec).
+    Identical prompts (same topic, same scraped pages) skip the model call.
+    """
+
+    def __init__(self, store: DiskCache):
+        self.store = store
+
+    def get(self, model: str, prompt: str, config: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        entry = self.store.get(llm_cache_key(model, prompt, config))
+        if entry is None:
+            return None
+        try:
+            payload = json.loads(entry.data.decode("utf-8"))
+            return payload["raw"], payload["spec"]
+        except (ValueError, KeyError):
+            return None
+
+    def set(
+        self,
+        model: str,
+        prompt: str,
+        config: Dict[str, Any],
+        raw: str,
+        spec: Dict[str, Any],
+    ) -> None:
+        payload = {"model": model, "raw": raw, "spec": spec}
+        self.store.set(
+            llm_cache_key(model, prompt, config),
+            json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+            meta={"model": model},
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return self.store.stats()
+
+
+_lock = threading.Lock()
+_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Process-wide LLM cache, or None when disabled via SDVG_LLM_CACHE=0."""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = LLMCache(
+                    DiskCache(LLM_CACHE_DIR, max_bytes=LLM_CACHE_MAX_BYTES, default_ttl=LLM_CACHE_TTL)
+                )
+    return _cache
@@ -0,0 +1,462 @@
+# sdvg/pipeline/llm_client.py
+from __future__ import annotations
+
+import asyncio
+import atexit
+import email.utils
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Protocol, Union
+
+from sdvg.pipeline.passages import estimate_tokens
+
+try:
+    import httpx
+    _TRANSIENT_ERRORS: tuple = (ConnectionError, TimeoutError, httpx.TransportError)
+except ImportError:  # pragma: no cover - httpx ships with google-genai
+    _TRANSIENT_ERRORS = (ConnectionError, TimeoutError)
+
+
+# provider quota (defaults sit under the Gemini Flash paid-tier limits)
+LLM_RPM = float(os.getenv("SDVG_LLM_RPM", "60"))
+LLM_TPM = float(os.getenv("SDVG_LLM_TPM", "250000"))
+LLM_MAX_IN_FLIGHT = int(os.getenv("SDVG_LLM_MAX_IN_FLIGHT", "4"))
+LLM_TIMEOUT = float(os.getenv("SDVG_LLM_TIMEOUT", "180"))  # queueing + all retries
+LLM_MAX_RETRIES = int(os.getenv("SDVG_LLM_MAX_RETRIES", "4"))
+LLM_BACKEND = os.getenv("SDVG_LLM_BACKEND", "gemini")  # or "stub"
+
+# output tokens are unknown up front; reserve this much per request
+OUTPUT_TOKEN_RESERVE = 1024
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """The request could not be queued, sent and answered before its deadline."""
+
+
+class LLMBackend(Protocol):
+    async def generate(self, model: str, prompt: str, config: Dict[str, Any]) -> str:
+        ...
+
+    def stream(self, model: str, prompt: str, config: Dict[str, Any]) -> AsyncIterator[str]:
+        ...
+
+
+_STREAM_DONE = object()
+
+
+class GeminiBackend:
+    """google-genai async client; created lazily on the client's event loop."""
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            from google import genai
+
+            api_key = self.api_key or os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise RuntimeError("Missing GEMINI_API_KEY. Put it in .env and restart your terminal.")
+            self._client = genai.Client(api_key=api_key)
+        return self._client
+
+    async def generate(self, model: str, prompt: str, config: Dict[str, Any]) -> str:
+        resp = await self._get_client().aio.models.generate_content(
+            model=model,
+            contents=prompt,
+            config=dict(config),
+        )
+        return resp.text
+
+    async def stream(self, model: str, prompt: str, config: Dict[str, Any]) -> AsyncIterator[str]:
+        chunks = await self._get_client().aio.models.generate_content_stream(
+            model=model,
+            contents=prompt,
+            config=dict(config),
+        )
+        async for resp in chunks:
+            if resp.text:
+                yield resp.text
+
+
+class StubBackend:
+    """
+    Offline stand-in for the model (tests / benchmarks / no API key).
+
+    `responder` is either a fixed response string or a callable
+    prompt -> response. The default returns a tiny client -> service spec
+    grounded in the first URL of the prompt, so the rest of the pipeline
+    has something real to work on. stream() replays the same response in
+    `chunk_chars` pieces, spreading `latency` across them.
+    """
+
+    def __init__(
+        self,
+        responder: Union[None, str, Callable[[str], str]] = None,
+        latency: float = 0.0,
+        chunk_chars: int = 64,
+    ):
+        self.responder = responder
+        self.latency = latency
+        self.chunk_chars = max(1, chunk_chars)
+        self.calls: List[str] = []
+
+    @classmethod
+    def from_file(cls, path: str) -> "StubBackend":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f.read())
+
+    async def generate(self, model: str, prompt: str, config: Dict[str, Any]) -> str:
+        self.calls.append(prompt)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(prompt)
+
+    async def stream(self, model: str, prompt: str, config: Dict[str, Any]) -> AsyncIterator[str]:
+        self.calls.append(prompt)
+        text = self._respond(prompt)
+        pieces = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+        for piece in pieces:
+            if self.latency:
+                await asyncio.sleep(self.latency / len(pieces))
+            yield piece
+
+    def _respond(self, prompt: str) -> str:
+        if callable(self.responder):
+            return self.responder(prompt)
+        if self.responder is not None:
+            return self.responder
+        return _default_stub_response(prompt)
+
+
+def _default_stub_response(prompt: str) -> str:
+    topic = re.search(r"^Topic: (.*)$", prompt, re.M)
+    level = re.search(r"^Level: (.*)$", prompt, re.M)
+    urls = re.findall(r"^URL: (\S+)", prompt, re.M)[:1]
+    return json.dumps({
+        "topic": topic.group(1) if topic else "",
+        "level": level.group(1) if level else "HLD",
+        "components": [
+            {"id": "client", "name": "Client", "type": "client",
+             "description": "End user app", "source_urls": urls},
+            {"id": "backend_service", "name": "Backend Service", "type": "service",
+             "description": "Handles requests", "source_urls": urls},
+        ],
+        "relationships": [
+            {"from_id": "client", "to_id": "backend_service", "relation": "SYNC_CALL",
+             "label": "request", "source_urls": urls},
+        ],
+    })
+
+
+class TokenBucket:
+    """
+    Per-minute budget refilled continuously. `acquire` waits for enough
+    capacity, or raises LLMDeadlineExceeded if that wait would run past
+    the caller's deadline. Only touched from the client's event loop.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = max(1.0, per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)  # oversize requests just take a full bucket
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    async def acquire(self, amount: float, deadline: float) -> None:
+        amount = min(amount, self.capacity)
+        while True:
+            wait = self.wait_time(amount)
+            if wait <= 0:
+                self.tokens -= amount
+                return
+            if time.monotonic() + wait > deadline:
+                raise LLMDeadlineExceeded(f"rate limit: needs {wait:.1f}s, past deadline")
+            await asyncio.sleep(wait)
+
+
+def _retry_after(err: BaseException) -> Optional[float]:
+    """Server-suggested delay: Retry-After header, else RetryInfo.retryDelay ("23s")."""
+    headers = getattr(getattr(err, "response", None), "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                when = email.utils.parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                when = None
+            if when is not None:
+                return max(0.0, when.timestamp() - time.time())
+
+    details = getattr(err, "details", None)
+    if isinstance(details, dict):
+        for d in (details.get("error") or {}).get("details") or []:
+            delay = d.get("retryDelay") if isinstance(d, dict) else None
+            if isinstance(delay, str) and delay.endswith("s"):
+                try:
+                    return max(0.0, float(delay[:-1]))
+                except ValueError:
+                    pass
+    return None
+
+
+def _is_retryable(err: BaseException) -> bool:
+    if isinstance(err, LLMDeadlineExceeded):
+        return False
+    code = getattr(err, "code", None)
+    if isinstance(code, int):
+        return code in RETRYABLE_STATUS
+    return isinstance(err, _TRANSIENT_ERRORS)
+
+
+class LLMClient:
+    """
+    Shared model client. All calls run on one private asyncio loop in a
+    background thread, so callers (worker threads or sync code) only hold a
+    Future while waiting. Every request:
+
+      1. takes 1 request from the RPM bucket and its estimated tokens from
+         the TPM bucket (prompt/4 + OUTPUT_TOKEN_RESERVE),
+      2. waits for one of `max_in_flight` slots (FIFO),
+      3. is retried on 408/429/5xx/network errors, sleeping for the server's
+         retry-after when given, else exponential backoff with jitter.
+
+    submit()/generate_sync() return the whole text; stream_sync() yields
+    chunks as the backend produces them.
+
+    Queueing, sending and retrying all count against one deadline
+    (`timeout` seconds from submit); running out raises LLMDeadlineExceeded.
+    """
+
+    def __init__(
+        self,
+        backend: LLMBackend,
+        rpm: float = LLM_RPM,
+        tpm: float = LLM_TPM,
+        max_in_flight: int = LLM_MAX_IN_FLIGHT,
+        max_retries: int = LLM_MAX_RETRIES,
+        timeout: float = LLM_TIMEOUT,
+    ):
+        self.backend = backend
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.max_in_flight = max(1, max_in_flight)
+        self.stats_lock = threading.Lock()
+        self.counters = {"requests": 0, "retries": 0, "deadline_exceeded": 0, "failed": 0}
+
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        # binds to the loop on first use (3.10+), i.e. the loop thread below
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="sdvg-llm", daemon=True)
+        self._thread.start()
+
+    def _count(self, key: str) -> None:
+        with self.stats_lock:
+            self.counters[key] += 1
+
+    async def _admit(self, cost: int, deadline: float) -> None:
+        """Rate buckets, then an in-flight slot (caller must release it)."""
+        await self._requests.acquire(1, deadline)
+        await self._tokens.acquire(cost, deadline)
+        remaining = deadline - time.monotonic()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), remaining)
+        except asyncio.TimeoutError:
+            raise LLMDeadlineExceeded("timed out waiting for an in-flight slot") from None
+
+    def _retry_delay(self, err: Exception, attempt: int, deadline: float) -> Optional[float]:
+        """Seconds to wait before retrying, or None to give up and re-raise."""
+        if attempt >= self.max_retries or not _is_retryable(err):
+            return None
+        delay = _retry_after(err)
+        if delay is None:
+            delay = (2 ** attempt) + random.random()
+        if time.monotonic() + delay > deadline:
+            raise LLMDeadlineExceeded(f"retry in {delay:.1f}s would pass the deadline") from err
+        self._count("retries")
+        return delay
+
+    async def _generate(self, model: str, prompt: str, config: Dict[str, Any], deadline: float) -> str:
+        cost = estimate_tokens(prompt) + OUTPUT_TOKEN_RESERVE
+        attempt = 0
+        while True:
+            await self._admit(cost, deadline)
+            try:
+                remaining = deadline - time.monotonic()
+                return await asyncio.wait_for(self.backend.generate(model, prompt, config), remaining)
+            except Exception as e:
+                # wait_for's own timeout; a backend's read timeout is just transient
+                if isinstance(e, asyncio.TimeoutError) and time.monotonic() >= deadline:
+                    raise LLMDeadlineExceeded("no response before the deadline") from None
+                delay = self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    raise
+                attempt += 1
+            finally:
+                self._slots.release()
+            await asyncio.sleep(delay)
+
+    async def _stream(
+        self,
+        model: str,
+        prompt: str,
+        config: Dict[str, Any],
+        deadline: float,
+        emit: Callable[[str], None],
+    ) -> None:
+        """
+        Like _generate, but hands each text chunk to `emit` as it arrives.
+        Only failures before the first chunk are retried; after that the
+        caller has already seen partial output.
+        """
+        cost = estimate_tokens(prompt) + OUTPUT_TOKEN_RESERVE
+        attempt = 0
+        while True:
+            await self._admit(cost, deadline)
+            started = False
+            try:
+                chunks = self.backend.stream(model, prompt, config).__aiter__()
+                while True:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), remaining)
+                    except StopAsyncIteration:
+                        return
+                    if chunk:
+                        started = True
+                        emit(chunk)
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError) and time.monotonic() >= deadline:
+                    raise LLMDeadlineExceeded("stream did not finish before the deadline") from None
+                delay = None if started else self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    raise
+                attempt += 1
+            finally:
+                self._slots.release()
+            await asyncio.sleep(delay)
+
+    def submit(
+        self,
+        model: str,
+        prompt: str,
+        config: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> Future:
+        """Queue one request; returns a concurrent.futures.Future of the response text."""
+        self._count("requests")
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        fut = asyncio.run_coroutine_threadsafe(self._generate(model, prompt, config, deadline), self._loop)
+        fut.add_done_callback(self._on_done)
+        return fut
+
+    def _on_done(self, fut: Future) -> None:
+        if fut.cancelled():
+            return
+        err = fut.exception()
+        if isinstance(err, LLMDeadlineExceeded):
+            self._count("deadline_exceeded")
+        elif err is not None:
+            self._count("failed")
+
+    def generate_sync(
+        self,
+        model: str,
+        prompt: str,
+        config: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> str:
+        return self.submit(model, prompt, config, timeout=timeout).result()
+
+    def stream_sync(
+        self,
+        model: str,
+        prompt: str,
+        config: Dict[str, Any],
+        timeout: Optional[float] = None,
+    ) -> Iterator[str]:
+        """
+        Blocking iterator over response chunks. Goes through the same limits
+        and deadline as submit(); closing the iterator early cancels the call.
+        """
+        self._count("requests")
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        chunks: "queue.Queue[Any]" = queue.Queue()
+        fut = asyncio.run_coroutine_threadsafe(
+            self._stream(model, prompt, config, deadline, chunks.put), self._loop
+        )
+        fut.add_done_callback(self._on_done)
+        fut.add_done_callback(lambda _: chunks.put(_STREAM_DONE))
+        try:
+            while True:
+                item = chunks.get()
+                if item is _STREAM_DONE:
+                    fut.result()  # re-raise whatever ended the stream
+                    return
+                yield item
+        finally:
+            if not fut.done():
+                fut.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.stats_lock:
+            return dict(self.counters, max_in_flight=self.max_in_flight)
+
+    def close(self) -> None:
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+
+_lock = threading.Lock()
+_client: Optional[LLMClient] = None
+
+
+def _default_backend() -> LLMBackend:
+    if LLM_BACKEND == "stub":
+        stub_file = os.getenv("SDVG_LLM_STUB_FILE")
+        return StubBackend.from_file(stub_file) if stub_file else StubBackend()
+    return GeminiBackend()
+
+
+def get_llm_client() -> LLMClient:
+    """Process-wide client (Gemini by default; SDVG_LLM_BACKEND=stub for offline runs)."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = LLMClient(_default_backend())
+                atexit.register(_client.close)
+    return _client
+
+
+def set_llm_client(client: Optional[LLMClient]) -> None:
+    """Swap the shared client (None = back to default on next use)."""
+    global _client
+    with _lock:
+        old, _client = _client, client
+    if old is not None and old is not client:
+        old.close()
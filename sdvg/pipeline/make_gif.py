@@ -1,21 +1,46 @@
 # sdvg/pipeline/make_gif.py
 from __future__ import annotations
 
-from typing import List, Tuple
-from PIL import Image, ImageEnhance
+from typing import Dict, List, Tuple
+from PIL import Image
+
+from sdvg.pipeline.gif_writer import save_animation
+
+FADE_LEVELS = [0.4, 0.6, 0.8, 1.0]
 
 
 def _zoom_frame(img: Image.Image, scale: float) -> Image.Image:
     """Zoom from center, keep same canvas size."""
     w, h = img.size
     nw, nh = int(w * scale), int(h * scale)
+    if (nw, nh) == (w, h):
+        return img.copy()
 
-    resized = img.resize((nw, nh), Image.Resampling.LANCZOS)
-
-    # center-crop back to original size
+    # same pixels as resize-to-(nw, nh) then center-crop, but only the
+    # visible part of the source is resampled
+    sx, sy = nw / w, nh / h
     left = (nw - w) // 2
     top = (nh - h) // 2
-    return resized.crop((left, top, left + w, top + h))
+    box = (left / sx, top / sy, (left + w) / sx, (top + h) / sy)
+    return img.resize((w, h), Image.Resampling.LANCZOS, box=box)
+
+
+def _fade_frames(img: Image.Image, levels: List[float]) -> List[Image.Image]:
+    """
+    Brightness steps with alpha untouched (what ImageEnhance.Brightness does),
+    as one 256-entry lookup table per level: a single table-lookup pass per
+    frame, no float blend with a black image.
+    """
+    img = img.convert("RGBA")
+    identity = list(range(256))
+    frames = []
+    for f in levels:
+        if f == 1.0:
+            frames.append(img.copy())
+            continue
+        lut = [min(255, int(v * f + 0.5)) for v in identity]
+        frames.append(img.point(lut * 3 + identity))
+    return frames
 
 
 def png_to_gif_pulse(
@@ -30,6 +55,7 @@ def png_to_gif_pulse(
     Creates a subtle pulse GIF from a single PNG.
     - scales controls zoom levels (e.g. [1.0, 1.02, 1.0])
     - add_fade_in adds a few frames that fade from dim->normal
+    - gif_path ending in .webp / .png writes animated WebP / APNG instead
     """
     if scales is None:
         scales = [1.00, 1.02, 1.03, 1.02, 1.00]
@@ -40,23 +66,14 @@ def png_to_gif_pulse(
 
     if add_fade_in:
         # 4 fade-in frames
-        for f in [0.4, 0.6, 0.8, 1.0]:
-            enhancer = ImageEnhance.Brightness(base)
-            frames.append(enhancer.enhance(f))
+        frames += _fade_frames(base, FADE_LEVELS)
 
+    # a scale that repeats (1.02 on the way in and out) is resampled once
+    zoomed: Dict[float, Image.Image] = {}
     for s in scales:
-        frames.append(_zoom_frame(base, s))
-
-    # Convert to palette for smaller GIF
-    frames_p = [fr.convert("P", palette=Image.Palette.ADAPTIVE, colors=256) for fr in frames]
-
-    frames_p[0].save(
-        gif_path,
-        save_all=True,
-        append_images=frames_p[1:],
-        duration=duration_ms,
-        loop=loop,
-        optimize=True,
-        disposal=2,
-    )
-    return gif_path
+        if s not in zoomed:
+            zoomed[s] = _zoom_frame(base, s)
+        frames.append(zoomed[s])
+
+    # one shared palette + delta frames (see gif_writer)
+    return save_animation(frames, gif_path, duration_ms=duration_ms, loop=loop)
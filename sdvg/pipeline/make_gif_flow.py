@@ -1,8 +1,141 @@
-from sdvg.pipeline.render_diagram import render_architecture_spec
+from sdvg.pipeline.gif_writer import GifWriter, build_palette
+from sdvg.pipeline.render_diagram import render_architecture_bytes
 
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import shutil
-from PIL import Image
+from typing import Dict, FrozenSet, List, Set, Tuple
+from PIL import Image, ImageDraw
+
+# highlight look (matches render_diagram's highlighted edges)
+HIGHLIGHT_PENWIDTH = 3.0   # points
+HIGHLIGHT_COLOR = (0, 0, 0, 255)
+BEZIER_STEPS = 16          # line segments per cubic bezier piece
+PNG_DPI = 96.0             # Graphviz default for bitmap output
+
+# dot renders run concurrently (subprocesses, so threads are enough)
+GIF_WORKERS = int(os.getenv("SDVG_GIF_WORKERS", str(os.cpu_count() or 4)))
+PALETTE_SAMPLE_STATES = 8  # dot-rendered frames sampled for the GIF palette
+
+
+def _bezier(points: List[Tuple[float, float]], steps: int = BEZIER_STEPS) -> List[Tuple[float, float]]:
+    """Flatten a Graphviz B-spline (p0, then 3 points per cubic piece) to a polyline."""
+    out = [points[0]]
+    for i in range(0, len(points) - 3, 3):
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3) = points[i:i + 4]
+        for k in range(1, steps + 1):
+            t = k / steps
+            u = 1 - t
+            out.append((
+                u * u * u * x0 + 3 * u * u * t * x1 + 3 * u * t * t * x2 + t * t * t * x3,
+                u * u * u * y0 + 3 * u * u * t * y1 + 3 * u * t * t * y2 + t * t * t * y3,
+            ))
+    return out
+
+
+class EdgeFlowLayout:
+    """
+    One dot layout of the spec, reused for every animation frame.
+
+    Renders the un-highlighted diagram once (png) plus its geometry once
+    (json: edge splines + arrowheads in graph points), then draws a frame
+    by over-painting only the highlighted edges on a copy of the base
+    image. Points map to pixels via the bounding box, the output dpi and
+    whatever padding dot added (derived from the image size).
+    """
+
+    def __init__(self, spec, direction: str = "TB", show_edge_labels: bool = False):
+        png = render_architecture_bytes(spec, fmt="png", direction=direction, show_edge_labels=show_edge_labels)
+        layout = json.loads(render_architecture_bytes(spec, fmt="json", direction=direction, show_edge_labels=show_edge_labels))
+
+        self.base = Image.open(io.BytesIO(png)).convert("RGBA")
+        self.base.load()
+
+        llx, lly, urx, ury = (float(v) for v in layout["bb"].split(","))
+        dpi = float(layout.get("dpi") or layout.get("resolution") or PNG_DPI)
+        self.scale = dpi / 72.0
+        w, h = self.base.size
+        self.pad_x = (w / self.scale - (urx - llx)) / 2
+        self.pad_y = (h / self.scale - (ury - lly)) / 2
+        self.llx, self.ury = llx, ury
+
+        names = {o["_gvid"]: o.get("name") for o in layout.get("objects", [])}
+        self.edges: Dict[Tuple[str, str], List[dict]] = {}
+        for e in layout.get("edges", []):
+            key = (names.get(e.get("tail")), names.get(e.get("head")))
+            self.edges.setdefault(key, []).append({
+                "curves": [
+                    [self._px(p) for p in _bezier(op["points"])]
+                    for op in e.get("_draw_", []) if op.get("op") in ("b", "B")
+                ],
+                "arrows": [
+                    [self._px(p) for p in op["points"]]
+                    for op in e.get("_hdraw_", []) + e.get("_tdraw_", []) if op.get("op") in ("P", "p")
+                ],
+                "dashed": any(s in (e.get("style") or "") for s in ("dotted", "dashed")),
+            })
+
+    def _px(self, p) -> Tuple[float, float]:
+        x, y = p
+        return (
+            (x - self.llx + self.pad_x) * self.scale,
+            (self.ury - y + self.pad_y) * self.scale,  # graphviz y grows upwards
+        )
+
+    def frame(self, highlight: Set[Tuple[str, str]]) -> Image.Image:
+        img = self.base.copy()
+        draw = ImageDraw.Draw(img)
+        width = max(1, round(HIGHLIGHT_PENWIDTH * self.scale))
+        for key in highlight:
+            for edge in self.edges.get(key, []):
+                for line in edge["curves"]:
+                    if edge["dashed"]:
+                        # every other segment, roughly the dotted look
+                        for i in range(0, len(line) - 1, 2):
+                            draw.line(line[i:i + 2], fill=HIGHLIGHT_COLOR, width=width)
+                    else:
+                        draw.line(line, fill=HIGHLIGHT_COLOR, width=width, joint="curve")
+                for poly in edge["arrows"]:
+                    draw.polygon(poly, fill=HIGHLIGHT_COLOR, outline=HIGHLIGHT_COLOR)
+        return img
+
+
+def plan_edge_flow(
+    edges: List[Tuple[str, str]],
+    frames: int = 18,
+    window: int = 3,
+) -> List[Tuple[FrozenSet[Tuple[str, str]], int]]:
+    """
+    The highlight sequence as (state, repeat) pairs, shortest form.
+
+    Frame i highlights `window` edges starting at i % len(edges). If the
+    sequence repeats with a period that divides `frames`, one period is
+    enough (the GIF loops forever anyway); runs of the same state become
+    one entry with a repeat count. So 3 edges x 18 frames -> 3 entries,
+    1 edge -> 1 entry.
+    """
+    if not edges:
+        return [(frozenset(), max(1, frames))]
+
+    seq = [
+        frozenset(edges[(i % len(edges) + k) % len(edges)] for k in range(min(window, len(edges))))
+        for i in range(frames)
+    ]
+    for period in range(1, len(seq) + 1):
+        if len(seq) % period == 0 and all(seq[i] == seq[i % period] for i in range(len(seq))):
+            seq = seq[:period]
+            break
+
+    plan: List[Tuple[FrozenSet[Tuple[str, str]], int]] = []
+    for state in seq:
+        if plan and plan[-1][0] == state:
+            plan[-1] = (state, plan[-1][1] + 1)
+        else:
+            plan.append((state, 1))
+    return plan
+
 
 def spec_to_gif_edge_flow(
     spec,
@@ -12,12 +145,22 @@ def spec_to_gif_edge_flow(
     window: int = 3,
     duration_ms: int = 120,
     keep_frames: bool = False,   # 👈 NEW FLAG
+    layout_once: bool = True,
 ):
+    """
+    Edge-flow GIF: a window of `window` highlighted edges walks the graph.
+
+    layout_once=True lays the graph out once and paints highlights onto the
+    fixed geometry (no per-frame dot run, no jitter); False re-renders every
+    frame with dot like before (renders run concurrently, kept as png
+    bytes). Either way only distinct highlight states are drawn (see
+    plan_edge_flow), and frames are streamed into the GIF one at a time,
+    so memory does not grow with the frame count. keep_frames=True also
+    writes them to `<out_base>_frames/`.
+    """
     out_base = Path(out_base)
     out_dir = out_base.parent
-    frames_dir = out_dir / f"{out_base.stem}_frames"
-
-    frames_dir.mkdir(parents=True, exist_ok=True)
+    out_dir.mkdir(parents=True, exist_ok=True)
 
     edges = [
         (r["from_id"], r["to_id"])
@@ -25,56 +168,57 @@ def spec_to_gif_edge_flow(
         if r.get("from_id") and r.get("to_id")
     ]
 
-    frame_paths = []
+    layout = EdgeFlowLayout(spec, direction=direction) if layout_once else None
 
-    for i in range(frames):
-        start = i % len(edges)
-        highlight = set(
-            edges[(start + k) % len(edges)]
-            for k in range(min(window, len(edges)))
-        )
+    # each distinct highlight state is drawn once; repeats become durations
+    plan = plan_edge_flow(edges, frames=frames, window=window)
+    unique_states = list(dict.fromkeys(state for state, _ in plan))
 
-        frame_path = frames_dir / f"frame_{i:03d}.png"
+    if layout is not None:
+        # canvas from the base image, palette from it plus every highlight;
+        # frames are painted on demand
+        size = layout.base.size
+        palette = build_palette([layout.base, layout.frame(set(layout.edges))])
 
-        render_architecture_spec(
-            spec,
-            out_path_no_ext=str(frame_path.with_suffix("")),
-            fmt="png",
-            direction=direction,
-            show_edge_labels=False,
-            highlight_edges=highlight,
-        )
+        def frame_for(state: FrozenSet[Tuple[str, str]]) -> Image.Image:
+            return layout.frame(set(state))
+    else:
+        def render(state: FrozenSet[Tuple[str, str]]) -> bytes:
+            return render_architecture_bytes(
+                spec,
+                fmt="png",
+                direction=direction,
+                show_edge_labels=False,
+                highlight_edges=set(state),
+            )
 
-        frame_paths.append(frame_path)
+        # only the compressed png bytes are held; sizes come from the headers
+        with ThreadPoolExecutor(max_workers=max(1, min(GIF_WORKERS, len(unique_states)))) as pool:
+            pngs = dict(zip(unique_states, pool.map(render, unique_states)))
+        sizes = [Image.open(io.BytesIO(b)).size for b in pngs.values()]
+        size = (max(w for w, _ in sizes), max(h for _, h in sizes))
 
-    # --- stitch GIF ---
-    images = [Image.open(p).convert("RGBA") for p in frame_paths]
+        def frame_for(state: FrozenSet[Tuple[str, str]]) -> Image.Image:
+            return Image.open(io.BytesIO(pngs[state])).convert("RGBA")
 
-    # normalize canvas size (prevents jitter)
-    max_w = max(im.width for im in images)
-    max_h = max(im.height for im in images)
+        # palette from evenly spaced states (decoded one at a time, kept
+        # downscaled), so colors that only show up later are covered too
+        step = max(1, len(unique_states) // PALETTE_SAMPLE_STATES)
+        palette = build_palette(frame_for(s) for s in unique_states[::step][:PALETTE_SAMPLE_STATES])
 
-    fixed = []
-    for im in images:
-        canvas = Image.new("RGBA", (max_w, max_h), (255, 255, 255, 255))
-        canvas.paste(
-            im,
-            ((max_w - im.width) // 2, (max_h - im.height) // 2),
-        )
-        fixed.append(canvas)
+    frames_dir = out_dir / f"{out_base.stem}_frames"
+    if keep_frames:
+        frames_dir.mkdir(parents=True, exist_ok=True)
 
+    # --- stream GIF: one decoded frame at a time, centered on `size` ---
     gif_path = out_base.with_suffix(".gif")
-    fixed[0].save(
-        gif_path,
-        save_all=True,
-        append_images=fixed[1:],
-        duration=duration_ms,
-        loop=0,
-        disposal=2,
-    )
-
-    # 🧹 cleanup frames unless requested
-    if not keep_frames:
-        shutil.rmtree(frames_dir)
+    saved = set()
+    with GifWriter(gif_path, size, palette, loop=0) as writer:
+        for state, repeat in plan:
+            frame = frame_for(state)
+            if keep_frames and state not in saved:
+                frame.save(frames_dir / f"frame_{unique_states.index(state):03d}.png")
+                saved.add(state)
+            writer.append(frame, duration_ms * repeat)
 
     return str(gif_path)
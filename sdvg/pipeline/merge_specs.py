@@ -0,0 +1,113 @@
+# sdvg/pipeline/merge_specs.py
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _key(s: str) -> str:
+    """snake_case key used to line up ids/names coming from different pages."""
+    return re.sub(r"[^a-z0-9]+", "_", (s or "").lower()).strip("_")
+
+
+def _majority(values: List[str]) -> str:
+    """Most common non-empty value; ties go to the first one seen."""
+    values = [v for v in values if v]
+    if not values:
+        return ""
+    counts = Counter(values)
+    best = max(counts.values())
+    return next(v for v in values if counts[v] == best)
+
+
+def _union(lists: List[List[str]]) -> List[str]:
+    out: List[str] = []
+    for urls in lists:
+        for u in urls or []:
+            if u not in out:
+                out.append(u)
+    return out
+
+
+def merge_specs(
+    topic: str,
+    level: str,
+    partials: List[Dict[str, Any]],
+    min_edge_support: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Deterministically merge per-page specs into one.
+
+    - components: ids are unified by snake_case id *or* name (so "api_gateway"
+      from one page and "API Gateway" from another become one node); name and
+      type go to the majority vote, source_urls are unioned
+    - relationships: rewritten to the unified ids; an edge is kept when at
+      least `min_edge_support` pages report it (default: 2 once 3+ pages
+      contributed components, else 1); relation/label by majority
+    Output order follows first appearance in `partials` order, so the same
+    inputs always produce the same spec.
+    """
+    if min_edge_support is None:
+        # pages that yielded nothing can't vote, so they don't raise the bar
+        contributing = sum(1 for p in partials if p.get("components"))
+        min_edge_support = 2 if contributing >= 3 else 1
+
+    alias: Dict[str, str] = {}  # id/name key -> canonical id
+    comps: Dict[str, List[Dict[str, Any]]] = {}  # canonical id -> reports
+    edge_reports: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    edge_pages: Dict[Tuple[str, str], set] = {}
+
+    for page_idx, spec in enumerate(partials):
+        local: Dict[str, str] = {}  # this page's ids -> canonical ids
+
+        for c in spec.get("components", []):
+            id_key = _key(c.get("id", ""))
+            name_key = _key(c.get("name", ""))
+            canonical = alias.get(id_key) or alias.get(name_key) or id_key or name_key
+            if not canonical:
+                continue
+            for k in (id_key, name_key):
+                if k:
+                    alias.setdefault(k, canonical)
+            local[c.get("id", "")] = canonical
+            comps.setdefault(canonical, []).append(c)
+
+        for r in spec.get("relationships", []):
+            a = local.get(r.get("from_id", ""))
+            b = local.get(r.get("to_id", ""))
+            if not a or not b or a == b:
+                continue
+            edge_reports.setdefault((a, b), []).append(r)
+            edge_pages.setdefault((a, b), set()).add(page_idx)
+
+    components = []
+    for cid, reports in comps.items():
+        descriptions = [r.get("description", "") for r in reports]
+        components.append({
+            "id": cid,
+            "name": _majority([r.get("name", "") for r in reports]) or cid,
+            "type": _majority([r.get("type", "") for r in reports]),
+            # longest description carries the most detail; first wins ties
+            "description": max(descriptions, key=len) if descriptions else "",
+            "source_urls": _union([r.get("source_urls") for r in reports]),
+        })
+
+    relationships = []
+    for (a, b), reports in edge_reports.items():
+        if len(edge_pages[(a, b)]) < min_edge_support:
+            continue
+        relationships.append({
+            "from_id": a,
+            "to_id": b,
+            "relation": _majority([r.get("relation", "") for r in reports]),
+            "label": _majority([r.get("label", "") for r in reports]),
+            "source_urls": _union([r.get("source_urls") for r in reports]),
+        })
+
+    return {
+        "topic": topic,
+        "level": level,
+        "components": components,
+        "relationships": relationships,
+    }
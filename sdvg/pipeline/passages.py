@@ -0,0 +1,198 @@
+# sdvg/pipeline/passages.py
+from __future__ import annotations
+
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Sequence
+
+from knowledge.components import TYPE_SYNONYMS
+from knowledge.relationships import EDGE_TYPES
+from sdvg.pipeline.keywords import DIAGRAM_HINTS, LIGHT_SIGNALS
+
+
+# whole prompt budget for page text, and the most any one page may take
+PROMPT_TOKEN_BUDGET = int(os.getenv("SDVG_PROMPT_TOKEN_BUDGET", "3000"))
+PAGE_TOKEN_CAP = int(os.getenv("SDVG_PAGE_TOKEN_CAP", "1000"))
+
+CHUNK_CHARS = 600       # ~150 tokens: a paragraph or two
+GAP_MARKER = "\n[...]\n"
+
+# BM25 params (the usual defaults)
+_K1 = 1.5
+_B = 0.75
+
+# topic words matter more than generic architecture words
+_TOPIC_WEIGHT = 2.0
+_VOCAB_WEIGHT = 1.0
+
+_WORD = re.compile(r"[a-z0-9]+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass
+class Passage:
+    index: int      # position in the page (output keeps this order)
+    text: str
+    tokens: int
+    score: float = 0.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars per token for English prose)."""
+    return math.ceil(len(text) / 4)
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+@lru_cache(maxsize=1)
+def _architecture_vocab() -> frozenset:
+    words = set()
+    for phrase in list(LIGHT_SIGNALS) + list(TYPE_SYNONYMS) + list(DIAGRAM_HINTS):
+        words.update(_words(phrase))
+    for edge in EDGE_TYPES:
+        words.update(_words(edge.replace("_", " ")))
+    return frozenset(w for w in words if len(w) > 1)
+
+
+def _query_weights(topic: str) -> Dict[str, float]:
+    weights = {w: _VOCAB_WEIGHT for w in _architecture_vocab()}
+    for w in _words(topic):
+        if w not in ("system", "design"):  # every candidate page says this
+            weights[w] = _TOPIC_WEIGHT
+    return weights
+
+
+def chunk_text(text: str, chunk_chars: int = CHUNK_CHARS) -> List[str]:
+    """
+    Paragraph-ish chunks of about `chunk_chars`. Short lines are glued
+    together; a paragraph that is too long is split on sentence ends.
+    """
+    pieces: List[str] = []
+    for para in re.split(r"\n\s*\n|\n", text or ""):
+        para = para.strip()
+        if not para:
+            continue
+        if len(para) <= chunk_chars:
+            pieces.append(para)
+            continue
+        buf = ""
+        for sent in _SENTENCE_END.split(para):
+            if buf and len(buf) + len(sent) + 1 > chunk_chars:
+                pieces.append(buf)
+                buf = ""
+            buf = f"{buf} {sent}".strip()
+            # a single run-on "sentence" (tables, code) gets a hard cut
+            while len(buf) > chunk_chars * 2:
+                pieces.append(buf[:chunk_chars])
+                buf = buf[chunk_chars:]
+        if buf:
+            pieces.append(buf)
+
+    chunks: List[str] = []
+    buf = ""
+    for p in pieces:
+        if buf and len(buf) + len(p) + 1 > chunk_chars:
+            chunks.append(buf)
+            buf = ""
+        buf = f"{buf}\n{p}" if buf else p
+    if buf:
+        chunks.append(buf)
+    return chunks
+
+
+def _bm25(chunks: List[List[str]], weights: Dict[str, float]) -> List[float]:
+    n = len(chunks)
+    if not n:
+        return []
+    avg_len = sum(len(c) for c in chunks) / n or 1.0
+    df = Counter()
+    for words in chunks:
+        df.update({w for w in set(words) if w in weights})
+
+    scores = []
+    for words in chunks:
+        tf = Counter(w for w in words if w in weights)
+        norm = _K1 * (1 - _B + _B * len(words) / avg_len)
+        s = 0.0
+        for w, f in tf.items():
+            idf = math.log(1 + (n - df[w] + 0.5) / (df[w] + 0.5))
+            s += weights[w] * idf * f * (_K1 + 1) / (f + norm)
+        scores.append(s)
+    return scores
+
+
+def rank_passages(topic: str, text: str, chunk_chars: int = CHUNK_CHARS) -> List[Passage]:
+    """All chunks of `text`, scored against the topic + architecture vocabulary."""
+    chunks = chunk_text(text, chunk_chars)
+    scores = _bm25([_words(c) for c in chunks], _query_weights(topic))
+    return [
+        Passage(index=i, text=c, tokens=estimate_tokens(c), score=s)
+        for i, (c, s) in enumerate(zip(chunks, scores))
+    ]
+
+
+def select_passages(topic: str, text: str, token_budget: int) -> str:
+    """
+    Best-scoring chunks of `text` that fit in `token_budget`, joined back in
+    page order (skipped stretches are marked with [...]). Chunks with no
+    topic/architecture words are dropped, so the budget is a ceiling, not a
+    target. Text that already fits is returned untouched.
+    """
+    text = (text or "").strip()
+    if estimate_tokens(text) <= token_budget:
+        return text
+
+    passages = rank_passages(topic, text)
+    if not any(p.score for p in passages):
+        # nothing on-topic: keep the old behaviour (leading text)
+        ranked = passages
+    else:
+        # off-topic chunks are never worth their tokens
+        ranked = sorted((p for p in passages if p.score), key=lambda p: (-p.score, p.index))
+
+    picked: List[Passage] = []
+    used = 0
+    for p in ranked:
+        if used + p.tokens > token_budget:
+            continue
+        picked.append(p)
+        used += p.tokens
+    picked.sort(key=lambda p: p.index)
+
+    out = []
+    prev = -1
+    for p in picked:
+        if out and p.index != prev + 1:
+            out.append(GAP_MARKER)
+        elif out:
+            out.append("\n")
+        out.append(p.text)
+        prev = p.index
+    return "".join(out)
+
+
+def split_budget(
+    texts: Sequence[str],
+    total: int = PROMPT_TOKEN_BUDGET,
+    cap: int = PAGE_TOKEN_CAP,
+) -> List[int]:
+    """
+    Per-page token allowances. Pages shorter than their fair share give the
+    leftover to the others; nobody gets more than `cap`.
+    """
+    needs = [estimate_tokens((t or "").strip()) for t in texts]
+    budgets = [0] * len(needs)
+    remaining = total
+    # smallest needs first, so their leftovers flow to the bigger pages
+    order = sorted(range(len(needs)), key=lambda i: needs[i])
+    for left, i in zip(range(len(order), 0, -1), order):
+        share = min(cap, remaining // left)
+        budgets[i] = min(needs[i], share)
+        remaining -= budgets[i]
+    return budgets
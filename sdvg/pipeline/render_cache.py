@@ -0,0 +1,74 @@
+# sdvg/pipeline/render_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from sdvg.pipeline.disk_cache import CACHE_ROOT, DiskCache
+
+
+RENDER_CACHE_ENABLED = os.getenv("SDVG_RENDER_CACHE", "1") != "0"
+RENDER_CACHE_DIR = os.path.join(CACHE_ROOT, "render")
+RENDER_CACHE_MAX_BYTES = int(os.getenv("SDVG_RENDER_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+@lru_cache(maxsize=1)
+def _graphviz_version() -> str:
+    # a dot upgrade can change the pixels, so it is part of the key
+    try:
+        import graphviz
+
+        return ".".join(str(v) for v in graphviz.version())
+    except Exception:
+        return "unknown"
+
+
+def render_cache_key(source: str, fmt: str, engine: str = "dot") -> str:
+    """
+    Content address of one render. `source` is the DOT text built from the
+    spec + render options, so it already covers direction, labels,
+    highlighted edges, simplification, and any styling change in the code.
+    """
+    blob = json.dumps(
+        {"source": source, "fmt": fmt, "engine": engine, "graphviz": _graphviz_version()},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return "render:" + hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """Rendered image bytes by content address (LRU by size, no expiry)."""
+
+    def __init__(self, store: DiskCache):
+        self.store = store
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self.store.get(key)
+        return entry.data if entry is not None else None
+
+    def set(self, key: str, data: bytes, fmt: str) -> None:
+        self.store.set(key, data, meta={"fmt": fmt})
+
+    def stats(self) -> Dict[str, Any]:
+        return self.store.stats()
+
+
+_lock = threading.Lock()
+_cache: Optional[RenderCache] = None
+
+
+def get_render_cache() -> Optional[RenderCache]:
+    """Process-wide render cache, or None when disabled via SDVG_RENDER_CACHE=0."""
+    global _cache
+    if not RENDER_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = RenderCache(DiskCache(RENDER_CACHE_DIR, max_bytes=RENDER_CACHE_MAX_BYTES))
+    return _cache
@@ -1,9 +1,13 @@
 # sdvg/pipeline/render_diagram.py
 from __future__ import annotations
 
+import os
 from typing import Dict, Any, List
 from graphviz import Digraph
 
+from sdvg.pipeline.render_cache import get_render_cache, render_cache_key
+from sdvg.pipeline.simplify_graph import MAX_DEGREE, simplify_spec
+
 
 TYPE_STYLE = {
     # type: (shape, extra_attrs)
@@ -150,20 +154,29 @@ def _is_core_edge(r: dict) -> bool:
 
 
 
-def render_architecture_spec(
+def build_architecture_graph(
     spec: Dict[str, Any],
-    out_path_no_ext: str = "out/diagram",
-    fmt: str = "png",
     direction: str = "TB",
     show_edge_labels: bool = False,
-    highlight_edges: set[tuple[str, str]] | None = None,   # ✅ ADD THIS
-) -> str:
-
+    highlight_edges: set[tuple[str, str]] | None = None,
+    simplify: bool = False,
+    max_degree: int | None = MAX_DEGREE,
+) -> Digraph:
     """
-    Renders spec -> image using Graphviz.
-    Returns the final output file path (e.g., out/diagram.png).
+    Builds the Graphviz graph for a spec (no layout / rendering yet).
+
+    simplify=True runs simplify_graph first (dedupe parallel edges, HLD
+    transitive reduction, degree cap) so big specs lay out in bounded time.
     """
 
+    if simplify:
+        spec = simplify_spec(
+            spec,
+            max_degree=max_degree,
+            edge_filter=_is_core_edge if spec.get("level") == "HLD" else None,
+            protected_types=DATA_TYPES,
+        )
+
     topic = spec.get("topic", "").upper()
     level = spec.get("level", "")
     title = f"{topic} — {level} Architecture" if topic or level else "Architecture"
@@ -246,7 +259,8 @@ def render_architecture_spec(
     highlight_edges = highlight_edges or set()
 
     for r in spec.get("relationships", []):
-        if spec.get("level") == "HLD" and not _is_core_edge(r):
+        # (already applied by simplify_spec, before labels got merged)
+        if spec.get("level") == "HLD" and not simplify and not _is_core_edge(r):
             continue
 
         a = r.get("from_id")
@@ -274,6 +288,74 @@ def render_architecture_spec(
             g.edge(a, b, **style_attrs)
 
 
-    # 3) render
-    out_file = g.render(filename=out_path_no_ext, format=fmt, cleanup=True)
+    return g
+
+
+def render_architecture_bytes(
+    spec: Dict[str, Any],
+    fmt: str = "png",
+    direction: str = "TB",
+    show_edge_labels: bool = False,
+    highlight_edges: set[tuple[str, str]] | None = None,
+    simplify: bool = False,
+    max_degree: int | None = MAX_DEGREE,
+    use_cache: bool = True,
+) -> bytes:
+    """
+    Renders spec -> image bytes (dot via pipe, no temp files).
+    Identical graphs come straight from the render cache.
+    """
+    g = build_architecture_graph(
+        spec,
+        direction=direction,
+        show_edge_labels=show_edge_labels,
+        highlight_edges=highlight_edges,
+        simplify=simplify,
+        max_degree=max_degree,
+    )
+
+    cache = get_render_cache() if use_cache else None
+    key = render_cache_key(g.source, fmt, g.engine) if cache else None
+    data = cache.get(key) if cache else None
+    if data is None:
+        data = g.pipe(format=fmt)
+        if cache is not None:
+            cache.set(key, data, fmt)
+    return data
+
+
+def render_architecture_spec(
+    spec: Dict[str, Any],
+    out_path_no_ext: str = "out/diagram",
+    fmt: str = "png",
+    direction: str = "TB",
+    show_edge_labels: bool = False,
+    highlight_edges: set[tuple[str, str]] | None = None,   # ✅ ADD THIS
+    simplify: bool = False,
+    max_degree: int | None = MAX_DEGREE,
+    use_cache: bool = True,
+) -> str:
+
+    """
+    Renders spec -> image using Graphviz.
+    Returns the final output file path (e.g., out/diagram.png).
+    """
+
+    data = render_architecture_bytes(
+        spec,
+        fmt=fmt,
+        direction=direction,
+        show_edge_labels=show_edge_labels,
+        highlight_edges=highlight_edges,
+        simplify=simplify,
+        max_degree=max_degree,
+        use_cache=use_cache,
+    )
+
+    out_file = f"{out_path_no_ext}.{fmt}"
+    out_dir = os.path.dirname(out_file)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    with open(out_file, "wb") as f:
+        f.write(data)
     return out_file
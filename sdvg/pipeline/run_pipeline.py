@@ -3,12 +3,14 @@ from __future__ import annotations
 import os
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable
 
 from sdvg.pipeline.discover_links import discover_links
-from sdvg.pipeline.scrape import scrape_url, PageContent
-from sdvg.pipeline.extract_spec import extract_spec
+from sdvg.pipeline.http_client import FetchResult
+from sdvg.pipeline.scrape import scrape_many, PageContent
+from sdvg.pipeline.extract_spec import extract_spec, extract_spec_stream
 from sdvg.pipeline.render_diagram import render_architecture_spec
 
 # If you want GIF generation:
@@ -28,6 +30,7 @@ class PipelineResult:
     scraped: int
     png_path: str
     gif_path: Optional[str] = None
+    preview_png_path: Optional[str] = None
 
 
 def _safe_slug(s: str) -> str:
@@ -44,16 +47,37 @@ def run_pipeline(
     make_gif: bool = True,
     out_dir: str = "out",
     keep_frames: bool = False,  # for flow-gif mode (optional)
+    scrape_workers: int = 4,
+    per_host_limit: int = 1,
+    per_host_delay: float = 1.0,
+    extraction: str = "single",  # or "map_reduce" / "heuristic" (no LLM)
+    preview: bool = False,
+    on_preview: Optional[Callable[[str], None]] = None,
+    stream: bool = False,
+    on_partial: Optional[Callable[[Dict[str, Any]], None]] = None,
+    simplify_graph: bool = False,  # dedupe/reduce edges before layout (big specs)
 ) -> PipelineResult:
     """
     End-to-end: discover -> scrape -> extract -> render -> (optional gif)
     Returns paths of output assets.
+
+    preview=True renders a heuristic (no-LLM) diagram to <out_base>_preview.png
+    while the model call is still running; on_preview(path) fires as soon as
+    it exists.
+
+    stream=True (single extraction only) reads the model output as it is
+    generated: on_partial(spec) gets every growing partial spec, and the
+    preview is drawn from the first partial that has an edge instead of
+    the heuristic one. Passing either with another extraction mode raises
+    ValueError.
     """
 
     topic = (topic or "").strip()
     level = (level or "").strip().upper()
     if level not in {"HLD", "LLD"}:
         raise ValueError("level must be HLD or LLD")
+    if (stream or on_partial is not None) and extraction != "single":
+        raise ValueError(f"stream/on_partial need extraction='single', got {extraction!r}")
 
     os.makedirs(out_dir, exist_ok=True)
 
@@ -62,22 +86,63 @@ def run_pipeline(
     safe_level = _safe_slug(level)
     out_base = os.path.join(out_dir, f"{safe_topic}_{safe_level}_{run_id}")
 
-    # 1) Discover links
-    links = discover_links(topic, level, max_links=max_links)
-
-    # 2) Scrape pages (skip failures)
-    pages: List[PageContent] = []
-    for url in links:
-        try:
-            pages.append(scrape_url(url))
-        except Exception as e:
-            print(f"[scrape skipped] {url} -> {type(e).__name__}: {e}")
+    # 1) Discover links (keep the bodies the light rerank already downloaded)
+    prefetched: Dict[str, FetchResult] = {}
+    links = discover_links(topic, level, max_links=max_links, prefetched=prefetched)
+
+    # 2) Scrape pages concurrently (skip failures)
+    pages: List[PageContent] = list(
+        scrape_many(
+            links,
+            max_workers=scrape_workers,
+            per_host_limit=per_host_limit,
+            per_host_delay=per_host_delay,
+            prefetched=prefetched,
+        )
+    )
+    prefetched.clear()
+    # pages arrive in completion order; restore discovery rank so extraction
+    # sees the same (best-first) pages on every run
+    rank = {url: i for i, url in enumerate(links)}
+    pages.sort(key=lambda p: rank.get(p.url, len(rank)))
 
     if not pages:
         raise RuntimeError("No pages could be scraped. Try different links or relax blockers.")
 
-    # 3) Extract spec
-    spec = extract_spec(topic, level, pages)
+    # 3) Extract spec (optionally with an early preview meanwhile)
+    preview_png_path = None
+
+    def _render_preview(build_spec: Callable[[], Dict[str, Any]]) -> Optional[str]:
+        try:
+            path = render_architecture_spec(
+                build_spec(),
+                out_path_no_ext=out_base + "_preview",
+                direction=direction,
+                show_edge_labels=show_edge_labels,
+                simplify=simplify_graph,
+            )
+        except Exception as e:
+            # the preview is best-effort; the real result is still coming
+            print(f"[preview skipped] {type(e).__name__}: {e}")
+            return None
+        if on_preview is not None:
+            on_preview(path)
+        return path
+
+    if stream and extraction == "single":
+        for spec in extract_spec_stream(topic, level, pages):
+            if on_partial is not None:
+                on_partial(spec)
+            if preview and preview_png_path is None and spec["relationships"]:
+                preview_png_path = _render_preview(lambda: spec)
+    elif preview and extraction != "heuristic":
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="sdvg-extract") as pool:
+            pending = pool.submit(extract_spec, topic, level, pages, mode=extraction)
+            # same grounded + canonicalized spec as extraction="heuristic"
+            preview_png_path = _render_preview(lambda: extract_spec(topic, level, pages, mode="heuristic"))
+            spec = pending.result()
+    else:
+        spec = extract_spec(topic, level, pages, mode=extraction)
 
     # 4) Render PNG
     png_path = render_architecture_spec(
@@ -85,6 +150,7 @@ def run_pipeline(
         out_path_no_ext=out_base,
         direction=direction,
         show_edge_labels=show_edge_labels,
+        simplify=simplify_graph,
     )
 
     gif_path = None
@@ -117,4 +183,5 @@ def run_pipeline(
         scraped=len(pages),
         png_path=png_path,
         gif_path=gif_path,
+        preview_png_path=preview_png_path,
     )
@@ -1,27 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional
 from urllib.parse import urljoin
 
-import requests
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 from readability import Document
 
 import re
 import time
 import random
-
-from playwright.sync_api import sync_playwright
-
-
-DIAGRAM_HINTS = ["diagram", "architecture", "flow", "hld", "lld", "system design", "sequence"]
-PAYWALL_HINTS = [
-    "this post is for paid subscribers",
-    "subscribe to continue",
-    "sign in to read",
-    "become a member",
-    "purchase",
-    "already a paid subscriber",
+import threading
+import email.utils
+
+from sdvg.pipeline.browser_pool import get_browser_pool
+from sdvg.pipeline.http_client import FetchRejected, FetchResult, check_response, fetch, http_get
+from sdvg.pipeline.keywords import DIAGRAM_HINTS, IMAGE_NOISE_HINTS, PAYWALL_HINTS, SIGNAL_MATCHER
+from sdvg.pipeline.urls import _host
+
+
+# Download limits: article pages are HTML and rarely need more than a few MB
+ARTICLE_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+SCRAPE_MAX_BYTES = 3 * 1024 * 1024
+EARLY_CHECK_BYTES = 64 * 1024
+
+# <title> of pages that are obviously not an article
+JUNK_TITLE_HINTS = ["page not found", "404 not found"]
+# whole title only, optionally "to <site>" and a short " | Site" suffix;
+# "Login System Design: ..." is exactly the kind of article we want
+JUNK_TITLE_RE = re.compile(
+    r"^(?:sign in|log in|login|sign up|subscribe)(?: to [\w.\- ]{1,30})?"
+    r"(?:\s*[|\-\u2013\u2014\u00b7]\s*\S+(?: \S+){0,2})?$"
+)
+
+# Responses that mean "a bot wall answered, not the site" -> retry in a real browser
+BOT_BLOCK_STATUSES = {403, 429, 503}
+BOT_BLOCK_HINTS = [
+    "<title>just a moment",
+    "attention required! | cloudflare",
+    "cf-browser-verification",
+    "cf_chl_",
+    "challenge-platform",
+    "px-captcha",
+    "are you a robot",
+    "enable javascript and cookies to continue",
+    "<title>access denied",
 ]
+# rate limits / overload: one plain retry after Retry-After before the browser
+RETRY_AFTER_STATUSES = {429, 503}
+RETRY_AFTER_DEFAULT_S = 2.0   # header missing or unreadable
+RETRY_AFTER_MAX_S = 30.0      # asked to wait longer -> straight to the browser
 
 
 @dataclass
@@ -42,36 +71,61 @@ class PageContent:
     diagram_score: int  # sum of image scores
 
 
+# stripped from the tree before readability runs (cheaper scoring, less memory)
+NOISE_TAGS = ("script", "style", "noscript", "nav", "template", "svg", "iframe")
+# additionally dropped when we fall back to full-page text
+FALLBACK_NOISE_TAGS = ("header", "footer")
+
+
 def _clean_text(s: str) -> str:
     return " ".join(s.split())
 
 
-def _extract_title(full_html: str) -> Optional[str]:
+def _node_text(node) -> str:
+    return _clean_text(" ".join(node.itertext()))
+
+
+def _parse_html(html: str):
+    """Parse a page once into an lxml tree (shared by every extraction step)."""
     try:
-        soup = BeautifulSoup(full_html, "lxml")
-        if soup.title and soup.title.string:
-            return soup.title.string.strip()[:200]
-    except Exception:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # str input that still carries an <?xml encoding=...?> declaration
+        parser = lxml.html.HTMLParser(encoding="utf-8")
+        return lxml.html.document_fromstring(html.encode("utf-8"), parser=parser)
+
+
+def _extract_title(doc) -> Optional[str]:
+    t = doc.find(".//title")
+    if t is None:
         return None
+    title = t.text_content().strip()
+    return title[:200] or None
+
+
+def _extract_og_image(doc) -> Optional[str]:
+    for content in doc.xpath('//meta[@property="og:image"]/@content'):
+        if content.strip():
+            return content.strip()
     return None
 
 
 def _is_paywalled(text: str) -> bool:
-    t = text.lower()
-    return any(h in t for h in PAYWALL_HINTS)
+    return bool(SIGNAL_MATCHER.present(text, only=PAYWALL_HINTS))
+
+
+_IMAGE_KEYWORDS = DIAGRAM_HINTS + IMAGE_NOISE_HINTS
 
 
 def _image_relevance(img_src: str, alt: str, caption: str) -> int:
     score = 0
-    blob = f"{img_src} {alt} {caption}".lower()
+    hits = SIGNAL_MATCHER.present(f"{img_src} {alt} {caption}", only=_IMAGE_KEYWORDS)
 
     # keyword signals
-    for k in DIAGRAM_HINTS:
-        if k in blob:
-            score += 2
+    score += 2 * sum(1 for k in DIAGRAM_HINTS if k in hits)
 
     # penalize obvious tiny/ui icons by filename hints
-    if any(x in blob for x in ["sprite", "icon", "logo"]):
+    if any(x in hits for x in IMAGE_NOISE_HINTS):
         score -= 2
 
     return score
@@ -99,10 +153,10 @@ def normalize_medium_url(url: str) -> str:
         return url.rstrip("/") + "/amp"
     return url
 
-def _via_jina_reader(url: str, headers: dict, timeout: int = 25) -> str:
+def _via_jina_reader(url: str, headers: Optional[dict] = None, timeout: int = 25) -> str:
     # Jina expects the original URL appended
     reader_url = "https://r.jina.ai/" + url
-    r = requests.get(reader_url, headers=headers, timeout=timeout)
+    r = http_get(reader_url, headers=headers, timeout=timeout)
     r.raise_for_status()
     return r.text  # usually markdown-ish text
 
@@ -122,51 +176,148 @@ def _extract_image_urls_from_text(text: str, max_images: int = 12) -> list[str]:
     return out[:max_images]
 
 def _fetch_html_playwright(url: str, timeout_ms: int = 30000) -> str:
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
-        page.wait_for_timeout(1500)  # let content settle
-        html = page.content()
-        browser.close()
-        return html
-
-
-def scrape_url(url: str, max_text_chars: int = 12000, max_images: int = 12) -> PageContent:
-    headers = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-    "Accept-Language": "en-US,en;q=0.9",
-    "Referer": "https://www.google.com/",
-    "Connection": "keep-alive",
-    }
-
-    session = requests.Session()
-    used_browser = False
-    #url = normalize_medium_url(url)
-    #session = requests.Session()
-    #used_jina = False
+    # warm pooled chromium (isolated context per fetch, images/fonts/media blocked)
+    return get_browser_pool().fetch(url, timeout_ms=timeout_ms)
+
+
+def _retry_after(headers: Dict[str, str]) -> float:
+    """Seconds the server asked us to wait (delta-seconds or HTTP date)."""
+    value = next((v for k, v in headers.items() if k.lower() == "retry-after"), None)
+    if not value:
+        return RETRY_AFTER_DEFAULT_S
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return RETRY_AFTER_DEFAULT_S
+    return max(0.0, when.timestamp() - time.time())
+
+
+def _looks_bot_blocked(status_code: int, html: str) -> bool:
+    if status_code in BOT_BLOCK_STATUSES:
+        return True
+    # challenge pages are small and say so near the top
+    head = html[:20000].lower()
+    return any(h in head for h in BOT_BLOCK_HINTS)
+
+
+_TITLE_RE = re.compile(rb"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+
+def _early_verdict(head: bytes) -> Optional[str]:
+    """
+    Cheap look at the first chunk of a page, before readability ever runs.
+    Returns a reason to drop the page, or None to keep going.
+    """
+    m = _TITLE_RE.search(head)
+    title = m.group(1).decode("utf-8", errors="replace").strip().lower() if m else ""
+    if any(h in title for h in JUNK_TITLE_HINTS) or JUNK_TITLE_RE.match(title):
+        return "not an article"
+
+    # one hint is common in nav/footers; two up top means a real paywall
+    text = head.decode("utf-8", errors="replace")
+    if len(SIGNAL_MATCHER.present(text, only=PAYWALL_HINTS)) >= 2:
+        return "paywalled"
+    return None
+
+
+def _polite_jitter() -> None:
+    time.sleep(0.5 + random.random())
 
+
+def _fetch_html(
+    url: str,
+    browser_fallback: bool = True,
+    max_bytes: Optional[int] = SCRAPE_MAX_BYTES,
+    drop_junk: bool = True,
+) -> str:
     last_err = None
+    blocked = False
+    waited = False
     for attempt in range(3):
         try:
-            # tiny jitter to avoid bot-pattern bursts
-            time.sleep(0.5 + random.random())
-
-            r = session.get(url, headers=headers, timeout=25)
+            # tiny jitter to avoid bot-pattern bursts (skipped on cache hits)
+            r = fetch(
+                url,
+                timeout=25,
+                before_request=_polite_jitter,
+                max_bytes=max_bytes,
+                allowed_types=ARTICLE_CONTENT_TYPES if drop_junk else None,
+                early_check=_early_verdict if drop_junk else None,
+                check_bytes=EARLY_CHECK_BYTES,
+            )
+            if browser_fallback and _looks_bot_blocked(r.status_code, r.text):
+                if r.status_code in RETRY_AFTER_STATUSES and not waited:
+                    # rate limited / overloaded: may just need a moment
+                    delay = _retry_after(r.headers)
+                    if delay <= RETRY_AFTER_MAX_S:
+                        waited = True
+                        time.sleep(delay)
+                        continue
+                # retrying plain HTTP won't get past a bot wall
+                blocked = True
+                break
             r.raise_for_status()
-            full_html = r.text
-            break
+            return r.text
+        except FetchRejected:
+            raise  # retrying won't turn it into an article
         except Exception as e:
             last_err = e
             time.sleep(1.5 * (attempt + 1))
-    else:
-        raise last_err
+    if blocked:
+        # one browser attempt, outside the retry loop: a failure here is final
+        return _fetch_html_playwright(url)
+    raise last_err
+
+
+def scrape_url(
+    url: str,
+    max_text_chars: int = 12000,
+    max_images: int = 12,
+    prefetched: Optional[FetchResult] = None,
+    browser_fallback: bool = True,
+    max_bytes: Optional[int] = SCRAPE_MAX_BYTES,
+    drop_junk: bool = True,
+) -> PageContent:
+    """
+    Fetch + clean one page. If `prefetched` holds a successful response for
+    this URL (e.g. from discover_links' light rerank), parsing starts from
+    that in-memory document and no request is made.
+    403/429/503 and bot-challenge pages are re-fetched through the pooled
+    headless browser unless browser_fallback=False; 429/503 first get one
+    plain retry after the server's Retry-After.
+    Downloads are streamed and capped at `max_bytes`. With drop_junk, non-HTML
+    responses, login/404 pages and hard paywalls are rejected from the first
+    chunk (FetchRejected) before the expensive readability pass.
+    """
+    #url = normalize_medium_url(url)
+    #session = requests.Session()
+    #used_jina = False
 
+    full_html = None
+    if prefetched is not None and prefetched.status_code < 400:
+        if drop_junk:
+            check_response(prefetched, ARTICLE_CONTENT_TYPES, _early_verdict, EARLY_CHECK_BYTES)
+        full_html = prefetched.text
+        if browser_fallback and _looks_bot_blocked(prefetched.status_code, full_html):
+            full_html = None
+    if full_html is None:
+        full_html = _fetch_html(
+            url, browser_fallback=browser_fallback, max_bytes=max_bytes, drop_junk=drop_junk
+        )
 
 
-    title = _extract_title(full_html)
-    
+
+    # one parse of the full page; everything below derives from this tree
+    doc = _parse_html(full_html)
+    del full_html
+
+    title = _extract_title(doc)
+    og_img = _extract_og_image(doc)
+
     # If we used Jina, we got reader-text not full HTML.
     # So we skip readability+BeautifulSoup path and return from here.
     """if used_jina:
@@ -196,35 +347,21 @@ def scrape_url(url: str, max_text_chars: int = 12000, max_images: int = 12) -> P
         )
     """
 
-    # OpenGraph image (often the main hero/diagram)
-    og_img = None
-    try:
-        soup_full = BeautifulSoup(full_html, "lxml")
-        meta = soup_full.find("meta", attrs={"property": "og:image"})
-        if meta and meta.get("content"):
-            og_img = meta["content"].strip()
-    except Exception:
-        pass
-
-    # 1) readability isolates main article HTML
-    doc = Document(full_html)
-    main_html = doc.summary(html_partial=True)
-
-    # 2) BeautifulSoup extracts clean text + images from the main content
-    soup = BeautifulSoup(main_html, "lxml")
+    # drop obvious noise before readability scores the tree
+    etree.strip_elements(doc, *NOISE_TAGS, with_tail=False)
 
-    # remove obvious noise
-    for tag in soup(["script", "style", "noscript"]):
-        tag.decompose()
+    # 1) readability isolates main article HTML (works on a copy of our tree)
+    main_html = Document(doc).summary(html_partial=True)
+    main = lxml.html.fromstring(main_html)
 
-    text = _clean_text(soup.get_text(" ", strip=True))
+    # 2) clean text + images from the (small) main content
+    text = _node_text(main)
 
     # Fallback: if readability extracted junk (too short), use full page text
     if len(text) < 500:
-        soup_full = BeautifulSoup(full_html, "lxml")
-        for tag in soup_full(["script", "style", "noscript", "header", "footer", "nav"]):
-            tag.decompose()
-        text = _clean_text(soup_full.get_text(" ", strip=True))
+        etree.strip_elements(doc, *FALLBACK_NOISE_TAGS, with_tail=False)
+        text = _node_text(doc)
+    del doc
 
     if len(text) > max_text_chars:
         text = text[:max_text_chars]
@@ -240,7 +377,7 @@ def scrape_url(url: str, max_text_chars: int = 12000, max_images: int = 12) -> P
         diagram_score += 1
     
     # Extract images from main article content
-    for img in soup.find_all("img"):
+    for img in main.iter("img"):
         src = _get_img_src(img)
 
         if not src:
@@ -250,11 +387,11 @@ def scrape_url(url: str, max_text_chars: int = 12000, max_images: int = 12) -> P
         alt = (img.get("alt") or "").strip()[:300]
 
         caption = ""
-        parent = img.parent
-        if parent and parent.name == "figure":
-            cap = parent.find("figcaption")
-            if cap:
-                caption = cap.get_text(" ", strip=True)[:300]
+        parent = img.getparent()
+        if parent is not None and parent.tag == "figure":
+            cap = parent.find(".//figcaption")
+            if cap is not None:
+                caption = _node_text(cap)[:300]
 
         score = _image_relevance(full_src, alt, caption)
         images.append(ImageRef(src=full_src, alt=alt or None, caption=caption or None, score=score))
@@ -274,3 +411,74 @@ def scrape_url(url: str, max_text_chars: int = 12000, max_images: int = 12) -> P
         is_paywalled=paywalled,
         diagram_score=diagram_score,
     )
+
+
+class _HostThrottle:
+    """
+    Per-host politeness: caps concurrent fetches to one host and spaces out
+    their start times, so a concurrent scrape doesn't look like a burst.
+    """
+
+    def __init__(self, max_concurrent: int = 1, min_delay: float = 1.0):
+        self.max_concurrent = max(1, max_concurrent)
+        self.min_delay = max(0.0, min_delay)
+        self._lock = threading.Lock()
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    @contextmanager
+    def slot(self, host: str):
+        with self._lock:
+            sem = self._slots.get(host)
+            if sem is None:
+                sem = threading.BoundedSemaphore(self.max_concurrent)
+                self._slots[host] = sem
+
+        with sem:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + self.min_delay
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+
+def scrape_many(
+    urls: List[str],
+    max_workers: int = 4,
+    per_host_limit: int = 1,
+    per_host_delay: float = 1.0,
+    prefetched: Optional[Dict[str, FetchResult]] = None,
+    **scrape_kwargs,
+) -> Iterator[PageContent]:
+    """
+    Scrape several URLs concurrently and yield pages in completion order.
+    Failures are logged and skipped, so one bad page never sinks the batch.
+    `prefetched` (url -> FetchResult) skips the download for those URLs.
+    Extra kwargs are passed through to scrape_url.
+    """
+    urls = [u for u in urls if u]
+    if not urls:
+        return
+
+    prefetched = prefetched or {}
+    throttle = _HostThrottle(max_concurrent=per_host_limit, min_delay=per_host_delay)
+
+    def _one(url: str) -> PageContent:
+        pre = prefetched.get(url)
+        if pre is not None:
+            # already in memory -> no request, no politeness wait
+            return scrape_url(url, prefetched=pre, **scrape_kwargs)
+        with throttle.slot(_host(url)):
+            return scrape_url(url, **scrape_kwargs)
+
+    workers = max(1, min(max_workers, len(urls)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sdvg-scrape") as pool:
+        futures = {pool.submit(_one, url): url for url in urls}
+        for fut in as_completed(futures):
+            url = futures[fut]
+            try:
+                yield fut.result()
+            except Exception as e:
+                print(f"[scrape skipped] {url} -> {type(e).__name__}: {e}")
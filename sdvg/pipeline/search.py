@@ -0,0 +1,171 @@
+# sdvg/pipeline/search.py
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+
+SEARCH_CACHE_TTL = float(os.getenv("SDVG_SEARCH_CACHE_TTL", "3600"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SDVG_SEARCH_CACHE_MAX_ENTRIES", "512"))
+
+SearchResult = Dict[str, Any]  # ddgs shape: {"title", "href", "body"}
+
+
+class SearchBackend(Protocol):
+    def text(self, query: str, max_results: int) -> List[SearchResult]:
+        ...
+
+
+class DDGSBackend:
+    """Live DuckDuckGo search (one DDGS session per call, so it is thread-safe)."""
+
+    def text(self, query: str, max_results: int) -> List[SearchResult]:
+        # imported here so fixture-backed runs don't need ddgs installed
+        from ddgs import DDGS
+
+        with DDGS() as ddgs:
+            return list(ddgs.text(query, max_results=max_results))
+
+
+class FixtureSearchBackend:
+    """
+    Offline stand-in for the live engine (tests / benchmarks).
+
+    `results` maps query -> list of ddgs-shaped dicts; a "*" key is used for
+    queries that aren't listed. Can also be loaded from a JSON file of the
+    same shape.
+    """
+
+    def __init__(self, results: Dict[str, List[SearchResult]]):
+        self.results = results
+
+    @classmethod
+    def from_file(cls, path: str) -> "FixtureSearchBackend":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def text(self, query: str, max_results: int) -> List[SearchResult]:
+        rows = self.results.get(query, self.results.get("*", []))
+        return [dict(r) for r in rows[:max_results]]
+
+
+class SearchCache:
+    """In-memory (query, max_results) -> results cache with TTL + LRU eviction."""
+
+    def __init__(self, ttl: float = SEARCH_CACHE_TTL, max_entries: int = SEARCH_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Tuple[str, int], Tuple[float, List[SearchResult]]]" = OrderedDict()
+
+    def get(self, query: str, max_results: int) -> Optional[List[SearchResult]]:
+        key = (query, max_results)
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or time.time() - item[0] > self.ttl:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return [dict(r) for r in item[1]]
+
+    def set(self, query: str, max_results: int, results: List[SearchResult]) -> None:
+        key = (query, max_results)
+        with self._lock:
+            self._data[key] = (time.time(), [dict(r) for r in results])
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "entries": len(self._data),
+            }
+
+
+_lock = threading.Lock()
+_backend: Optional[SearchBackend] = None
+_cache = SearchCache()
+
+
+def get_search_backend() -> SearchBackend:
+    """Live DDGS by default; SDVG_SEARCH_FIXTURE=<file.json> switches to a fixture."""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                fixture = os.getenv("SDVG_SEARCH_FIXTURE")
+                _backend = FixtureSearchBackend.from_file(fixture) if fixture else DDGSBackend()
+    return _backend
+
+
+def set_search_backend(backend: Optional[SearchBackend]) -> None:
+    """Swap the backend (None = back to default). Clears cached results."""
+    global _backend
+    with _lock:
+        _backend = backend
+    _cache.clear()
+
+
+def get_search_cache() -> SearchCache:
+    return _cache
+
+
+def search_many(
+    queries: List[str],
+    max_results: int,
+    backend: Optional[SearchBackend] = None,
+    max_workers: int = 4,
+    use_cache: bool = True,
+) -> List[List[SearchResult]]:
+    """
+    Run several queries concurrently; returns one result list per query,
+    in the same order as `queries`. A failing query yields [] (logged) and
+    is not cached, so the other queries still count.
+    """
+    backend = backend or get_search_backend()
+    results: List[Optional[List[SearchResult]]] = [None] * len(queries)
+
+    pending = []
+    for i, q in enumerate(queries):
+        cached = _cache.get(q, max_results) if use_cache else None
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append(i)
+
+    def _one(q: str) -> List[SearchResult]:
+        try:
+            rows = backend.text(q, max_results=max_results)
+        except Exception as e:
+            print(f"[search failed] {q!r} -> {type(e).__name__}: {e}")
+            return []
+        if use_cache:
+            _cache.set(q, max_results, rows)
+        return rows
+
+    if pending:
+        workers = max(1, min(max_workers, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sdvg-search") as pool:
+            for i, rows in zip(pending, pool.map(_one, [queries[i] for i in pending])):
+                results[i] = rows
+
+    return [r or [] for r in results]
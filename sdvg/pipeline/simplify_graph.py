@@ -0,0 +1,195 @@
+# sdvg/pipeline/simplify_graph.py
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+MAX_DEGREE = 8
+
+
+def _merge_labels(labels: Iterable[str]) -> str:
+    seen: List[str] = []
+    for label in labels:
+        label = (label or "").strip()
+        if label and label.lower() not in (s.lower() for s in seen):
+            seen.append(label)
+    return " / ".join(seen)
+
+
+def collapse_parallel_edges(relationships: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One edge per (from, to): first relation kept, labels merged ("reads / writes")."""
+    by_pair: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for r in relationships:
+        by_pair.setdefault((r.get("from_id"), r.get("to_id")), []).append(r)
+
+    out = []
+    for (a, b), group in by_pair.items():
+        if a == b:
+            continue
+        urls: List[str] = []
+        for r in group:
+            urls += [u for u in r.get("source_urls") or [] if u not in urls]
+        out.append({
+            **group[0],
+            "label": _merge_labels(r.get("label") or r.get("relation") for r in group),
+            "source_urls": urls,
+        })
+    return out
+
+
+def _reachable(adj: Dict[str, Set[str]], start: str, target: str, skip: Tuple[str, str]) -> bool:
+    """Is `target` reachable from `start` without using the edge `skip`?"""
+    stack = [n for n in adj.get(start, ()) if (start, n) != skip]
+    seen = set(stack)
+    while stack:
+        node = stack.pop()
+        if node == target:
+            return True
+        for nxt in adj.get(node, ()):
+            if nxt not in seen:
+                seen.add(nxt)
+                stack.append(nxt)
+    return False
+
+
+def transitive_reduction(
+    relationships: List[Dict[str, Any]],
+    keep: Optional[Callable[[Dict[str, Any]], bool]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Drop a -> c when c is still reachable from a another way (a -> b -> c).
+
+    Edges are tested one at a time against the graph as it stands, so in a
+    cycle only one of two mutually-redundant edges goes. `keep(r)` protects
+    edges that carry their own meaning (e.g. writes to a database).
+    """
+    adj: Dict[str, Set[str]] = {}
+    for r in relationships:
+        adj.setdefault(r["from_id"], set()).add(r["to_id"])
+
+    out = []
+    for r in relationships:
+        a, c = r["from_id"], r["to_id"]
+        if (keep is None or not keep(r)) and _reachable(adj, a, c, skip=(a, c)):
+            adj[a].discard(c)
+            continue
+        out.append(r)
+    return out
+
+
+def cap_degree(
+    components: List[Dict[str, Any]],
+    relationships: List[Dict[str, Any]],
+    max_degree: int = MAX_DEGREE,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Summarize hubs: while a node has more than `max_degree` edges, its leaf
+    neighbours (connected to nothing else) of one type and direction are
+    folded into a single "+N more" node of that type. Best-effort: a hub whose
+    neighbours aren't leaves stays as is.
+    """
+    comp_by_id = {c["id"]: c for c in components}
+    rels = list(relationships)
+
+    def degree() -> Counter:
+        d: Counter = Counter()
+        for r in rels:
+            d[r["from_id"]] += 1
+            d[r["to_id"]] += 1
+        return d
+
+    summaries: List[Dict[str, Any]] = []
+    deg = degree()
+    for hub in [c["id"] for c in components]:
+        while deg[hub] > max_degree:
+            # (direction, type) -> leaf edges, fewest sources first
+            groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+            for r in rels:
+                if r["from_id"] == hub and deg[r["to_id"]] == 1:
+                    other, direction = r["to_id"], "out"
+                elif r["to_id"] == hub and deg[r["from_id"]] == 1:
+                    other, direction = r["from_id"], "in"
+                else:
+                    continue
+                if other not in comp_by_id:
+                    continue  # already a summary node
+                key = (direction, comp_by_id[other].get("type", ""))
+                groups.setdefault(key, []).append(r)
+
+            groups = {k: v for k, v in groups.items() if len(v) >= 2}
+            if not groups:
+                break
+            (direction, ctype), edges = max(groups.items(), key=lambda kv: len(kv[1]))
+            excess = deg[hub] - max_degree
+            edges.sort(key=lambda r: len(r.get("source_urls") or []))
+            folded = edges[: max(2, excess + 1)]
+
+            hidden = [r["to_id"] if direction == "out" else r["from_id"] for r in folded]
+            summary_id = f"{hub}__more_{direction}_{len(summaries)}"
+            urls: List[str] = []
+            for r in folded:
+                urls += [u for u in r.get("source_urls") or [] if u not in urls]
+            summaries.append({
+                "id": summary_id,
+                "name": f"+{len(hidden)} more",  # renderer adds "(type)" underneath
+                "type": ctype,
+                "description": ", ".join(comp_by_id[h].get("name", h) for h in hidden),
+                "source_urls": urls,
+            })
+            first = folded[0]
+            folded_ids = {id(r) for r in folded}
+            rels = [r for r in rels if id(r) not in folded_ids]
+            rels.append({
+                **first,
+                "from_id": hub if direction == "out" else summary_id,
+                "to_id": summary_id if direction == "out" else hub,
+                "label": _merge_labels(r.get("label") for r in folded),
+                "source_urls": urls,
+            })
+            for h in hidden:
+                comp_by_id.pop(h, None)
+            deg = degree()
+
+    kept = [c for c in components if c["id"] in comp_by_id] + summaries
+    return kept, rels
+
+
+def simplify_spec(
+    spec: Dict[str, Any],
+    transitive: Optional[bool] = None,
+    max_degree: Optional[int] = MAX_DEGREE,
+    edge_filter: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    protected_types: Iterable[str] = (),
+) -> Dict[str, Any]:
+    """
+    Smaller graph for layout, same meaning at a glance:
+
+      1. edge_filter (e.g. the renderer's HLD core-edge test) and dangling edges
+      2. parallel / duplicate edges collapsed, labels merged
+      3. transitive reduction (default: HLD only); edges into
+         `protected_types` nodes (data stores) are never reduced
+      4. degree cap with "+N more" summary nodes (max_degree=None: off)
+
+    Returns a new spec; the input is untouched.
+    """
+    components = [dict(c) for c in spec.get("components", [])]
+    ids = {c["id"] for c in components}
+    rels = [
+        dict(r) for r in spec.get("relationships", [])
+        if r.get("from_id") in ids and r.get("to_id") in ids
+        and (edge_filter is None or edge_filter(r))
+    ]
+
+    rels = collapse_parallel_edges(rels)
+
+    if transitive is None:
+        transitive = spec.get("level") == "HLD"
+    if transitive:
+        protected = {t.lower() for t in protected_types}
+        type_of = {c["id"]: (c.get("type") or "").strip().lower() for c in components}
+        rels = transitive_reduction(rels, keep=lambda r: type_of.get(r["to_id"]) in protected)
+
+    if max_degree:
+        components, rels = cap_degree(components, rels, max_degree)
+
+    return {**spec, "components": components, "relationships": rels}
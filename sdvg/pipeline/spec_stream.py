@@ -0,0 +1,132 @@
+# sdvg/pipeline/spec_stream.py
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Tuple
+
+
+SpecEvent = Tuple[str, Any]  # ("topic" | "level", str) or ("component" | "relationship", dict)
+
+_ARRAY_EVENTS = {"components": "component", "relationships": "relationship"}
+_SCALAR_KEYS = {"topic", "level"}
+
+
+class IncrementalSpecParser:
+    """
+    Feed the model's JSON a chunk at a time; get back every component and
+    relationship object as soon as its closing brace arrives.
+
+    Only tracks enough structure to find those objects: string/escape state,
+    nesting depth, and which top-level key we're under. Each completed
+    object is handed to json.loads on its own, so a malformed one is skipped
+    without losing the rest. Anything before the first "{" (code fences,
+    chatter) is ignored. Total work is linear in the response size.
+    """
+
+    def __init__(self):
+        self.buf = ""
+        self.pos = 0
+        self.started = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.string_start = -1
+        self.last_string = ""       # most recent complete string at depth 1
+        self.top_key = None         # top-level key whose value we're inside
+        self.expect_value = False   # saw "key": at depth 1
+        self.obj_start = -1         # start of the array item being collected
+
+        self.topic = ""
+        self.level = ""
+        self.components: List[Dict[str, Any]] = []
+        self.relationships: List[Dict[str, Any]] = []
+
+    def feed(self, chunk: str) -> List[SpecEvent]:
+        self.buf += chunk
+        events: List[SpecEvent] = []
+        buf = self.buf
+        i = self.pos
+        n = len(buf)
+
+        if not self.started:
+            brace = buf.find("{", i)
+            if brace < 0:
+                self.pos = n
+                return events
+            self.started = True
+            i = brace
+
+        while i < n:
+            ch = buf[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 1:
+                        self._on_top_string(buf[self.string_start:i + 1], events)
+            elif ch == '"':
+                self.in_string = True
+                self.string_start = i
+            elif ch in "{[":
+                if self.depth == 1:
+                    self.expect_value = False  # value is an array/object
+                self.depth += 1
+                if ch == "{" and self.depth == 3 and self.top_key in _ARRAY_EVENTS:
+                    self.obj_start = i
+            elif ch in "}]":
+                if ch == "}" and self.depth == 3 and self.obj_start >= 0:
+                    self._on_item(buf[self.obj_start:i + 1], events)
+                    self.obj_start = -1
+                self.depth -= 1
+                if self.depth == 1:
+                    self.top_key = None
+            elif ch == ":" and self.depth == 1:
+                self.top_key = self.last_string
+                self.expect_value = True
+            elif ch == "," and self.depth == 1:
+                self.top_key = None
+                self.expect_value = False
+            i += 1
+
+        self.pos = n
+        return events
+
+    def _on_top_string(self, raw: str, events: List[SpecEvent]) -> None:
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            # bad escape etc.: drop this string (a key or a value), keep parsing
+            self.expect_value = False
+            self.last_string = ""  # a broken key must not inherit the previous one
+            return
+        if self.expect_value:
+            # "topic": "uber" -> this string is the value
+            self.expect_value = False
+            if self.top_key in _SCALAR_KEYS:
+                setattr(self, self.top_key, value)
+                events.append((self.top_key, value))
+        else:
+            self.last_string = value
+
+    def _on_item(self, raw: str, events: List[SpecEvent]) -> None:
+        try:
+            obj = json.loads(raw)
+        except ValueError:
+            return
+        if not isinstance(obj, dict):
+            return
+        kind = _ARRAY_EVENTS[self.top_key]
+        (self.components if kind == "component" else self.relationships).append(obj)
+        events.append((kind, obj))
+
+    def partial_spec(self) -> Dict[str, Any]:
+        """Everything completed so far, in the extract_spec shape (fresh copies)."""
+        return json.loads(json.dumps({
+            "topic": self.topic,
+            "level": self.level,
+            "components": self.components,
+            "relationships": self.relationships,
+        }))
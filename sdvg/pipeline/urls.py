@@ -0,0 +1,47 @@
+# sdvg/pipeline/urls.py
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+
+TRACKING_KEYS_PREFIX = ("utm_",)
+TRACKING_KEYS_EXACT = {"gclid", "fbclid", "msclkid", "yclid", "mc_cid", "mc_eid"}
+
+def _canonical_url(url: str) -> str:
+    """
+    Remove tracking query params and normalize scheme/host/path.
+    """
+    try:
+        p = urlparse(url)
+        # drop fragment
+        fragment = ""
+
+        # clean query params
+        q = []
+        for k, v in parse_qsl(p.query, keep_blank_values=True):
+            lk = k.lower()
+            if lk in TRACKING_KEYS_EXACT:
+                continue
+            if any(lk.startswith(pref) for pref in TRACKING_KEYS_PREFIX):
+                continue
+            q.append((k, v))
+        query = urlencode(q, doseq=True)
+
+        # normalize: lowercase hostname, strip trailing slash
+        netloc = (p.hostname or "").lower()
+        if p.port:
+            netloc = f"{netloc}:{p.port}"
+
+        path = p.path or ""
+        if path != "/":
+            path = path.rstrip("/")
+
+        clean = urlunparse((p.scheme or "https", netloc, path, p.params, query, fragment))
+        return clean
+    except Exception:
+        return url
+
+
+def _host(url: str) -> str:
+    try:
+        return (urlparse(url).hostname or "").lower()
+    except Exception:
+        return ""
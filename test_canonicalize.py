@@ -0,0 +1,73 @@
+from knowledge.components import DIAGRAM_TYPES
+from sdvg.pipeline.canonicalize import canonical_type, canonicalize_partials, canonicalize_spec
+from sdvg.pipeline.merge_specs import merge_specs
+
+
+def _spec(components, relationships=()):
+    return {
+        "topic": "uber",
+        "level": "HLD",
+        "components": [{"id": i, "name": n, "type": t, "source_urls": []} for i, n, t in components],
+        "relationships": [{"from_id": a, "to_id": b, "label": "", "source_urls": []} for a, b in relationships],
+    }
+
+
+def test_product_and_its_consumer_stay_separate():
+    spec = canonicalize_spec(_spec(
+        [("kafka", "Kafka", "message queue"), ("consumer", "Kafka Consumer Service", "service")],
+        [("kafka", "consumer")],
+    ))
+    assert [c["id"] for c in spec["components"]] == ["kafka", "consumer"]
+    assert [(r["from_id"], r["to_id"]) for r in spec["relationships"]] == [("kafka", "consumer")]
+
+
+def test_product_with_type_words_merges():
+    spec = canonicalize_spec(_spec([
+        ("redis", "Redis", "cache"),
+        ("redis_cache", "Redis Cache", "cache"),
+        ("s3", "S3", "storage"),
+        ("aws_s3", "Amazon S3", "object storage"),
+    ]))
+    assert [c["id"] for c in spec["components"]] == ["redis", "s3"]
+
+
+def test_index_service_is_a_service():
+    assert canonical_type("index service") == "service"
+    assert canonical_type("", "Search Index Service") == "service"
+    assert canonical_type("search index") == "data store"
+
+
+def test_map_reduce_edge_votes_use_canonical_ids():
+    partials = [
+        _spec([("matching_service", "Matching Service", "service"), (cid, name, "cache")], [("matching_service", cid)])
+        for cid, name in [("redis", "Redis"), ("redis_cache", "Redis Cache"), ("cache", "Cache")]
+    ]
+    spec = merge_specs("uber", "HLD", canonicalize_partials(partials))
+    assert [c["id"] for c in spec["components"]] == ["matching_service", "redis"]
+    assert [(r["from_id"], r["to_id"]) for r in spec["relationships"]] == [("matching_service", "redis")]
+
+
+def test_empty_pages_do_not_raise_edge_support():
+    partials = [
+        _spec([("trip", "Trip Service", "service"), ("postgres", "Postgres", "database")], [("trip", "postgres")]),
+        _spec([]),
+        _spec([]),
+    ]
+    spec = merge_specs("uber", "HLD", partials)
+    assert [(r["from_id"], r["to_id"]) for r in spec["relationships"]] == [("trip", "postgres")]
+
+
+def test_diagram_types_match_renderer():
+    from sdvg.pipeline.render_diagram import TYPE_STYLE
+
+    assert set(DIAGRAM_TYPES) == set(TYPE_STYLE)
+
+
+if __name__ == "__main__":
+    test_product_and_its_consumer_stay_separate()
+    test_product_with_type_words_merges()
+    test_index_service_is_a_service()
+    test_map_reduce_edge_votes_use_canonical_ids()
+    test_empty_pages_do_not_raise_edge_support()
+    test_diagram_types_match_renderer()
+    print("ok")
@@ -0,0 +1,25 @@
+from sdvg.pipeline.heuristic_extract import heuristic_extract
+from sdvg.pipeline.scrape import PageContent
+
+
+def _edges(*texts):
+    pages = [PageContent(f"https://example.com/{i}", None, t, [], False, 0) for i, t in enumerate(texts)]
+    spec = heuristic_extract("uber", "HLD", pages)
+    return {(r["from_id"], r["to_id"], r["relation"]) for r in spec["relationships"]}
+
+
+def test_verb_between_two_stores_is_not_an_edge():
+    edges = _edges("The trip service writes trips to Postgres and reads driver locations from Redis.")
+    assert ("trip_service", "postgres", "WRITE") in edges
+    assert not any({a, b} == {"postgres", "redis"} for a, b, _ in edges)
+
+
+def test_store_as_subject_keeps_its_verb():
+    edges = _edges("Redis stores sessions in Postgres.")
+    assert ("redis", "postgres", "WRITE") in edges
+
+
+if __name__ == "__main__":
+    test_verb_between_two_stores_is_not_an_edge()
+    test_store_as_subject_keeps_its_verb()
+    print("ok")